@@ -0,0 +1,196 @@
+"""Admission control: per-route concurrency limits, bounded queues, deadlines.
+
+Each limited route holds at most `concurrency` requests in flight; up to
+`queue` more wait in FIFO order and anything beyond that is rejected at
+once with 503 + Retry-After, before the body is read or Mongo is touched.
+
+A request's budget starts when it arrives, so time spent queued counts
+against it: a waiter that cannot be admitted within its budget is shed,
+and an admitted one runs under pymongo.timeout() for what is left. Motor
+copies the context into its executor threads, so every driver call in the
+request gets maxTimeMS (and connection checkout / server selection
+timeouts) derived from the remaining budget. A Mongo timeout that escapes
+the endpoint becomes a 503 as well, rather than a 500.
+"""
+import asyncio
+import contextvars
+import logging
+import math
+import time
+from collections import deque
+from typing import Awaitable, Deque, Dict, Optional, Tuple, TypeVar
+
+import pymongo
+from pymongo.errors import PyMongoError
+
+from metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_QUEUE_WAIT, ADMISSION_SHED
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Bounds on the Retry-After hint, in seconds
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 30
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of admitted"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionLimit:
+    """Concurrency limit with a bounded FIFO wait queue.
+
+    Also keeps a moving average of how long admitted requests hold their
+    slot, which sizes the Retry-After hint: roughly how long the current
+    queue takes to drain.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._service_time = 0.05
+        self._report()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _report(self) -> None:
+        ADMISSION_IN_FLIGHT.set(self.name, value=self.active)
+        ADMISSION_QUEUE_DEPTH.set(self.name, value=len(self._waiters))
+
+    def retry_after(self) -> int:
+        drain = self._service_time * (len(self._waiters) + 1) / self.concurrency
+        return max(MIN_RETRY_AFTER, min(MAX_RETRY_AFTER, math.ceil(drain)))
+
+    def _shed(self, reason: str) -> Overloaded:
+        ADMISSION_SHED.inc(self.name, reason)
+        return Overloaded(reason, self.retry_after())
+
+    async def acquire(self, timeout: Optional[float]) -> None:
+        """Take a slot, waiting at most `timeout` seconds (None waits as long as it takes)"""
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            self._report()
+            ADMISSION_QUEUE_WAIT.observe(0.0, self.name)
+            return
+        if len(self._waiters) >= self.queue:
+            raise self._shed("queue_full")
+        if timeout is not None and timeout <= 0:
+            raise self._shed("deadline")
+
+        started = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._report()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over as we gave up; pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+                self._report()
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._shed("deadline")
+            raise
+        ADMISSION_QUEUE_WAIT.observe(time.perf_counter() - started, self.name)
+
+    def release(self, held: Optional[float] = None) -> None:
+        if held is not None:
+            self._service_time += 0.1 * (held - self._service_time)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # Hand the slot straight to the next waiter; `active` is unchanged
+                waiter.set_result(None)
+                self._report()
+                return
+        self.active -= 1
+        self._report()
+
+
+def detached(coro: Awaitable[T]) -> Awaitable[T]:
+    """Run `coro` outside the current request's Mongo deadline.
+
+    For cleanup that must still happen after the budget has run out, such
+    as releasing a claim for a quote that failed to insert.
+    """
+    return asyncio.create_task(coro, context=contextvars.Context())
+
+
+def _is_timeout(error: BaseException) -> bool:
+    return isinstance(error, PyMongoError) and error.timeout
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware applying AdmissionLimits by method and path.
+
+    `routes` maps (method, path) to (limit, budget seconds or None). Several
+    routes may share one limit. Unlisted routes pass straight through.
+    """
+
+    def __init__(self, app, routes: Dict[Tuple[str, str], Tuple[AdmissionLimit, Optional[float]]]):
+        self.app = app
+        self.routes = routes
+
+    async def _reject(self, send, retry_after: int, detail: str) -> None:
+        body = b'{"detail":"' + detail.encode() + b'"}'
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        route = self.routes.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+
+        limit, budget = route
+        arrived = time.monotonic()
+        try:
+            await limit.acquire(budget)
+        except Overloaded as e:
+            await self._reject(send, e.retry_after, "Server busy, retry later")
+            return
+
+        admitted = time.monotonic()
+        started = False
+
+        async def send_wrapper(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            # timeout(0) would mean "no deadline", so never pass less than 1ms
+            remaining = max(0.001, budget - (admitted - arrived)) if budget is not None else None
+            with pymongo.timeout(remaining):
+                await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            if not _is_timeout(e) or started:
+                raise
+            ADMISSION_SHED.inc(limit.name, "mongo_timeout")
+            logger.warning(f"{scope['method']} {scope['path']} ran out of its {budget}s budget: {e}")
+            await self._reject(send, limit.retry_after(), "Request timed out, retry later")
+        finally:
+            limit.release(time.monotonic() - admitted)
@@ -0,0 +1,221 @@
+"""Concurrent load and latency benchmark for every route on api_router.
+
+Run from backend/:
+
+    python -m benchmarks.api_load --requests 2000 --concurrency 32
+    python -m benchmarks.api_load --mode uvicorn --compare benchmarks/results/baseline.json
+
+`inprocess` mode drives the ASGI app directly through httpx; `uvicorn` mode
+serves the same app on a local port and goes over real HTTP. Either way the
+database is an in-memory Mongo stand-in and Brevo is a fake transport (see
+benchmarks/harness.py). Results are written as JSON; `--compare` reports
+p95 / throughput changes against an earlier run and exits 1 on regression.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import httpx
+
+from benchmarks import harness
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+_counter = itertools.count()
+
+
+def _quote_request():
+    return "POST", "/api/quote", {"json": harness.quote_payload(next(_counter))}
+
+
+# Request factories for routes that need more than a bare GET
+REQUESTS: Dict[str, Callable[[], tuple]] = {
+    "POST /api/quote": _quote_request,
+    "GET /api/quotes": lambda: ("GET", "/api/quotes", {"params": {"limit": 50}}),
+    "GET /api/quotes/search": lambda: ("GET", "/api/quotes/search", {"params": {"q": "roof", "prefix": "true"}}),
+}
+
+# Routes that depend on resources outside the harness (remote source images),
+# or that admission control deliberately runs only a couple at a time (bulk
+# export and rehydration)
+SKIP = {"GET /api/images/{key}/{width}.{fmt}", "GET /api/quotes/export", "POST /api/quotes/rehydrate"}
+
+
+def endpoints(app_router) -> Dict[str, Callable[[], tuple]]:
+    """One request factory per route registered on api_router"""
+    result = {}
+    for route in app_router.routes:
+        for method in sorted(route.methods):
+            name = f"{method} {route.path}"
+            if name in SKIP:
+                continue
+            result[name] = REQUESTS.get(name, lambda m=method, p=route.path: (m, p, {}))
+    return result
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+async def run_endpoint(client: httpx.AsyncClient, factory, total: int, concurrency: int) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    remaining = itertools.count()
+
+    async def worker():
+        nonlocal errors
+        while next(remaining) < total:
+            method, path, kwargs = factory()
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            latencies.append((time.perf_counter() - start) * 1000)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(latencies[-1], 3) if latencies else 0.0,
+    }
+
+
+def _serve_uvicorn(app, port: int):
+    """Serve the app from a separate thread and event loop, like a real server"""
+    import threading
+
+    import uvicorn
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on")
+    uv_server = uvicorn.Server(config)
+    thread = threading.Thread(target=uv_server.run, daemon=True)
+    thread.start()
+    while not uv_server.started:
+        time.sleep(0.01)
+    return uv_server, thread
+
+
+async def run(args) -> dict:
+    app, _, transport = harness.install(email_delay=args.email_delay)
+    await harness.seed_quotes(args.seed)
+
+    uv_server = thread = None
+    if args.mode == "uvicorn":
+        uv_server, thread = _serve_uvicorn(app, args.port)
+        client = httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}",
+                                   limits=httpx.Limits(max_connections=args.concurrency))
+    else:
+        await app.router.startup()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+    results = {}
+    try:
+        targets = endpoints(harness.server.api_router)
+        for name, factory in targets.items():
+            if args.only and not any(part in name for part in args.only):
+                continue
+            # Warm up caches and connections before measuring
+            await run_endpoint(client, factory, min(args.warmup, args.requests), args.concurrency)
+            results[name] = await run_endpoint(client, factory, args.requests, args.concurrency)
+            print(_format_row(name, results[name]), flush=True)
+    finally:
+        await client.aclose()
+        if uv_server is not None:
+            uv_server.should_exit = True
+            thread.join()
+        else:
+            await app.router.shutdown()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "mode": args.mode,
+            "requests_per_endpoint": args.requests,
+            "concurrency": args.concurrency,
+            "seeded_quotes": args.seed,
+            "email_delay_s": args.email_delay,
+            "emails_delivered": len(transport.sent),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "endpoints": results,
+    }
+
+
+def _format_row(name: str, r: dict) -> str:
+    return (f"{name:<28}{r['throughput_rps']:>10.1f}{r['p50_ms']:>10.2f}"
+            f"{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['errors']:>8}")
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Print per-endpoint deltas; return the endpoints that regressed beyond tolerance"""
+    regressions = []
+    for name, now in current["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before:
+            continue
+        p95_change = (now["p95_ms"] - before["p95_ms"]) / before["p95_ms"] if before["p95_ms"] else 0.0
+        rps_change = ((now["throughput_rps"] - before["throughput_rps"]) / before["throughput_rps"]
+                      if before["throughput_rps"] else 0.0)
+        print(f"{name:<28} p95 {p95_change:+7.1%}   throughput {rps_change:+7.1%}")
+        if p95_change > tolerance or rps_change < -tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--requests", type=int, default=1000, help="measured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=500, help="quotes inserted before measuring")
+    parser.add_argument("--email-delay", type=float, default=0.05, help="fake Brevo latency in seconds")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--only", nargs="*", help="substrings of endpoint names to run")
+    parser.add_argument("--output", type=Path, help="where to write the JSON results")
+    parser.add_argument("--compare", type=Path, help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression")
+    args = parser.parse_args()
+
+    print(f"{'endpoint':<28}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    report = asyncio.run(run(args))
+
+    output = args.output or RESULTS_DIR / f"api-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nresults written to {output}")
+
+    if args.compare:
+        regressions = compare(report, json.loads(args.compare.read_text()), args.tolerance)
+        if regressions:
+            print(f"\nregressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
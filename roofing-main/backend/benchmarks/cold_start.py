@@ -0,0 +1,128 @@
+"""Cold-start benchmark: process spawn to first successful response.
+
+Starts a fresh uvicorn process per run and polls GET /api/services until it
+returns 200, for each STARTUP_MODE. The per-phase timings the app reports in
+app_startup_phase_seconds are collected from /api/metrics afterwards.
+
+Run from backend/:
+
+    python -m benchmarks.cold_start --runs 5
+    python -m benchmarks.cold_start --mongo-url mongodb://localhost:27017
+
+Without --mongo-url each child uses the in-memory Mongo stand-in, so index
+and catalog setup are nearly free and the difference between modes is
+mostly import and SDK cost; against a real server it includes the round
+trips lazy mode defers.
+"""
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+PHASE_LINE = re.compile(r'^app_startup_phase_seconds\{phase="([^"]+)"\} ([0-9.eE+-]+)$')
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def child(port: int, in_memory: bool) -> None:
+    """Serve the app the way a container would, optionally on in-memory Mongo"""
+    import uvicorn
+
+    if in_memory:
+        from benchmarks import harness
+        from brevo_client import BrevoClient
+
+        app, _, _ = harness.install()
+        # Keep a real Brevo client so its SDK load is part of startup
+        harness.server.brevo_client = BrevoClient(api_key="bench", sender_email="bench@example.com")
+    else:
+        import server
+
+        app = server.app
+    uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")).run()
+
+
+def run_once(mode: str, mongo_url: str, timeout: float) -> Dict[str, float]:
+    port = free_port()
+    env = {**os.environ, "STARTUP_MODE": mode, "PYTHONPATH": str(BACKEND_DIR)}
+    command = [sys.executable, "-m", "benchmarks.cold_start", "--child", "--port", str(port)]
+    if mongo_url:
+        env.update(MONGO_URL=mongo_url, DB_NAME=env.get("DB_NAME", "roofing_bench"))
+    else:
+        command.append("--in-memory")
+
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+    try:
+        url = f"http://127.0.0.1:{port}"
+        with httpx.Client(base_url=url, timeout=1.0) as client:
+            while True:
+                if time.perf_counter() - started > timeout:
+                    raise TimeoutError(f"{mode}: no response within {timeout}s")
+                if process.poll() is not None:
+                    raise RuntimeError(f"{mode}: server exited with {process.returncode}")
+                try:
+                    if client.get("/api/services").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.005)
+            result = {"first_response": time.perf_counter() - started}
+            # Give background phases a moment to report
+            time.sleep(0.5)
+            for line in client.get("/api/metrics").text.splitlines():
+                match = PHASE_LINE.match(line)
+                if match:
+                    result[match.group(1)] = float(match.group(2))
+        return result
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modes", nargs="+", default=["eager", "lazy"])
+    parser.add_argument("--mongo-url", default=None, help="use a real MongoDB instead of the in-memory stand-in")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--in-memory", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.port, args.in_memory)
+        return
+
+    results: Dict[str, List[Dict[str, float]]] = {}
+    for mode in args.modes:
+        results[mode] = [run_once(mode, args.mongo_url, args.timeout) for _ in range(args.runs)]
+
+    phases = sorted({phase for runs in results.values() for run in runs for phase in run} - {"first_response"})
+    columns = ["first_response"] + phases
+    print(f"median of {args.runs} runs, milliseconds")
+    print(f"{'phase':<18}" + "".join(f"{mode:>12}" for mode in args.modes))
+    for column in columns:
+        cells = []
+        for mode in args.modes:
+            values = [run[column] for run in results[mode] if column in run]
+            cells.append(f"{statistics.median(values) * 1000:>12.1f}" if values else f"{'-':>12}")
+        print(f"{column:<18}" + "".join(cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Micro-benchmark: compiled email templates vs. the old inline f-strings.
+
+Run from backend/:  python -m benchmarks.email_templates [--number N]
+"""
+import argparse
+import timeit
+
+from email_templates import get_template, render_quote_emails, render_quote_emails_batch
+
+QUOTE = {
+    "id": "0b373e7c-a17e-4a26-b40b-a6ca470985e8",
+    "name": "Jane <Citizen>",
+    "email": "jane@example.com",
+    "phone": "0400 123 456",
+    "service_type": "Re-Roofing",
+    "address": "12 Example St, Blacktown NSW 2148",
+    "message": "Leaking around the skylight & gutter.\nPlease call after 5pm.",
+}
+
+
+class _Quote:
+    def __init__(self, values):
+        self.__dict__.update(values)
+
+
+def fstring_emails(quote_obj):
+    """The pre-template submit_quote rendering path, kept verbatim for comparison"""
+    email_html = f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; padding: 20px; background-color: #f8fafc;">
+        <div style="max-width: 600px; margin: 0 auto; background: white; padding: 30px; border: 1px solid #e2e8f0; border-radius: 8px;">
+            <h1 style="color: #0f172a; margin-bottom: 20px;">New Quote Request</h1>
+            <table style="width: 100%; border-collapse: collapse;">
+                <tr style="border-bottom: 1px solid #e2e8f0;">
+                    <td style="padding: 10px 0; color: #64748b; font-weight: bold;">Name:</td>
+                    <td style="padding: 10px 0; color: #0f172a;">{quote_obj.name}</td>
+                </tr>
+                <tr style="border-bottom: 1px solid #e2e8f0;">
+                    <td style="padding: 10px 0; color: #64748b; font-weight: bold;">Email:</td>
+                    <td style="padding: 10px 0; color: #0f172a;">{quote_obj.email}</td>
+                </tr>
+                <tr style="border-bottom: 1px solid #e2e8f0;">
+                    <td style="padding: 10px 0; color: #64748b; font-weight: bold;">Phone:</td>
+                    <td style="padding: 10px 0; color: #0f172a;">{quote_obj.phone}</td>
+                </tr>
+                <tr style="border-bottom: 1px solid #e2e8f0;">
+                    <td style="padding: 10px 0; color: #64748b; font-weight: bold;">Service Type:</td>
+                    <td style="padding: 10px 0; color: #0f172a;">{quote_obj.service_type}</td>
+                </tr>
+                <tr>
+                    <td style="padding: 10px 0; color: #64748b; font-weight: bold;">Address:</td>
+                    <td style="padding: 10px 0; color: #0f172a;">{quote_obj.address or 'N/A'}</td>
+                </tr>
+            </table>
+            <p style="margin-top: 20px; color: #64748b; white-space: pre-wrap; word-wrap: break-word;">
+                <strong>Message:</strong><br>{quote_obj.message or 'No additional message'}
+            </p>
+        </div>
+    </body>
+    </html>
+    """
+    
+    customer_email_html = f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; padding: 20px; background-color: #f8fafc;">
+        <div style="max-width: 600px; margin: 0 auto; background: white; padding: 30px; border: 1px solid #e2e8f0; border-radius: 8px;">
+            <h1 style="color: #0f172a; margin-bottom: 20px; font-size: 24px;">✓ Quote Request Received</h1>
+            <p style="color: #0f172a; font-size: 16px; line-height: 1.6;">
+                Hi <strong>{quote_obj.name}</strong>,<br><br>
+                Thank you for choosing <strong>22G Roofing</strong>! We've successfully received your quote request for <strong>{quote_obj.service_type}</strong>.<br><br>
+                Our team will review your request and get back to you shortly at <strong>{quote_obj.phone}</strong> or <strong>{quote_obj.email}</strong>.
+            </p>
+            
+            <div style="background-color: #f1f5f9; padding: 20px; border-left: 4px solid #0ea5e9; margin: 20px 0; border-radius: 4px;">
+                <h3 style="color: #0f172a; margin-top: 0;">Your Quote Details:</h3>
+                <table style="width: 100%;">
+                    <tr>
+                        <td style="color: #64748b; font-weight: bold;">Request ID:</td>
+                        <td style="color: #0f172a;"><code style="background: white; padding: 4px 8px; border-radius: 4px;">{quote_obj.id}</code></td>
+                    </tr>
+                    <tr>
+                        <td style="color: #64748b; font-weight: bold; padding-top: 8px;">Service Type:</td>
+                        <td style="color: #0f172a; padding-top: 8px;">{quote_obj.service_type}</td>
+                    </tr>
+                </table>
+            </div>
+            
+            <p style="color: #64748b; font-size: 14px;">
+                <strong>Contact Us:</strong><br>
+                📞 Pavandeep Singh: +61 448 046 461<br>
+                📞 Bhupendra Singh: +61 410 632 540<br>
+                📧 Email: sales22groofing@outlook.com<br>
+                📍 Address: 12 Bedford Road, Blacktown NSW 2148, Australia
+            </p>
+            
+            <p style="margin-top: 30px; color: #64748b; font-size: 12px; border-top: 1px solid #e2e8f0; padding-top: 20px;">
+                This is an automated response. Please do not reply to this email.
+            </p>
+        </div>
+    </body>
+    </html>
+    """
+    return email_html, customer_email_html
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=100)
+    args = parser.parse_args()
+
+    quote_obj = _Quote(QUOTE)
+    get_template("admin_quote_email")
+    get_template("customer_quote_email")
+
+    results = {
+        "f-string": timeit.timeit(lambda: fstring_emails(quote_obj), number=args.number),
+        "compiled": timeit.timeit(lambda: render_quote_emails(QUOTE), number=args.number),
+    }
+    batch = [QUOTE] * args.batch
+    rounds = max(1, args.number // args.batch)
+    results[f"compiled batch x{args.batch}"] = timeit.timeit(
+        lambda: render_quote_emails_batch(batch),
+        number=rounds,
+    )
+
+    print(f"{'path':<24}{'us/quote':>12}")
+    for name, seconds in results.items():
+        per_quote = seconds / args.number * 1e6
+        print(f"{name:<24}{per_quote:>12.2f}")
+    admin, customer = fstring_emails(quote_obj)
+    compiled = render_quote_emails(QUOTE)
+    print(f"\nbytes per quote: f-string {len(admin) + len(customer)}, "
+          f"compiled {len(compiled['admin']) + len(compiled['customer'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Run the API in-process against an in-memory Mongo and a fake Brevo transport.
+
+Nothing here talks to a real database or sends real email, so results are
+reproducible on any machine.
+"""
+import logging
+import os
+import uuid
+
+# Settings server.py reads from the environment
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "roofing_bench")
+os.environ.setdefault("NOTIFICATION_EMAIL", "office@example.com")
+# The in-memory Mongo has no change streams; the version poll is enough
+os.environ.setdefault("CATALOG_CHANGE_STREAM", "0")
+
+from mongomock_motor import AsyncMongoMockClient  # noqa: E402
+
+import server  # noqa: E402
+from email_outbox import EmailOutbox, FakeTransport  # noqa: E402
+
+SERVICE_TYPES = ["New Roof Installations", "Re-Roofing", "Metal Roofing", "Gutter & Fascia", "Skylights Velux"]
+
+
+def quote_payload(n: int) -> dict:
+    """A unique, valid QuoteRequestCreate body"""
+    return {
+        "name": f"Bench Customer {n}",
+        "email": f"bench{n}@example.com",
+        "phone": f"04{n % 100000000:08d}",
+        "service_type": SERVICE_TYPES[n % len(SERVICE_TYPES)],
+        "address": f"{n} Example Street, Blacktown NSW 2148",
+        "message": f"Benchmark request {uuid.uuid4()}",
+    }
+
+
+def install(email_delay: float = 0.0, quiet: bool = True):
+    """Point the server module at an in-memory database and a fake Brevo.
+
+    Returns (app, db, transport).
+    """
+    if quiet:
+        logging.getLogger().setLevel(logging.WARNING)
+    db = AsyncMongoMockClient()[os.environ["DB_NAME"]]
+    transport = FakeTransport(delay=email_delay)
+    server.brevo_client = None
+    server.init_db(db)
+    server.email_outbox = EmailOutbox(db, transport, poll_interval=0.05, compose=server.quote_notifications)
+    return server.app, db, transport
+
+
+async def seed_quotes(n: int) -> None:
+    """Insert `n` quotes through the normal submit path"""
+    from httpx import ASGITransport, AsyncClient
+
+    async with AsyncClient(transport=ASGITransport(app=server.app), base_url="http://bench") as client:
+        for i in range(n):
+            response = await client.post("/api/quote", json=quote_payload(1_000_000 + i))
+            response.raise_for_status()
@@ -0,0 +1,75 @@
+"""Serialization cost of the /api/quotes and /api/projects payloads.
+
+Compares FastAPI's default path (validate against the response_model,
+jsonable_encoder, stdlib json) with the fast path used now: orjson straight
+from the Mongo documents.
+
+Run from backend/:  python -m benchmarks.json_encoding [--quotes N]
+
+For end-to-end numbers run the load benchmark twice, with FAST_JSON=0 and
+FAST_JSON=1:  python -m benchmarks.api_load --only quotes projects
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from benchmarks import harness
+from json_response import USE_ORJSON, dumps
+
+server = harness.server
+
+
+def fastapi_default(adapter: TypeAdapter, payload) -> bytes:
+    """What FastAPI does for a route with response_model=List[...]"""
+    validated = adapter.validate_python(payload)
+    encoded = jsonable_encoder(adapter.dump_python(validated, mode="json"))
+    return json.dumps(encoded, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def quote_docs(n: int) -> List[dict]:
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    docs = []
+    for i in range(n):
+        doc = harness.quote_payload(i)
+        doc["id"] = f"00000000-0000-0000-0000-{i:012d}"
+        doc["created_at"] = start + timedelta(minutes=i)
+        docs.append(doc)
+    return docs
+
+
+def bench(label: str, fn, number: int) -> float:
+    seconds = timeit.timeit(fn, number=number) / number
+    print(f"  {label:<34}{seconds * 1e3:>10.3f} ms")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quotes", type=int, default=1000)
+    parser.add_argument("--number", type=int, default=50)
+    args = parser.parse_args()
+    print(f"orjson enabled: {USE_ORJSON}")
+
+    docs = quote_docs(args.quotes)
+    quote_adapter = TypeAdapter(List[server.QuoteRequest])
+    print(f"\n/api/quotes ({args.quotes} documents)")
+    before = bench("FastAPI default", lambda: fastapi_default(quote_adapter, docs), args.number)
+    after = bench("fast path (raw docs)", lambda: dumps(docs), args.number)
+    print(f"  speed-up: {before / after:.1f}x")
+
+    # The catalog is read back from Mongo as plain documents
+    projects = [project.model_dump() for project in server.get_projects_data()]
+    project_adapter = TypeAdapter(List[server.Project])
+    print(f"\n/api/projects ({len(projects)} projects)")
+    before = bench("FastAPI default", lambda: fastapi_default(project_adapter, projects), args.number * 100)
+    after = bench("fast path (raw docs)", lambda: dumps(projects), args.number * 100)
+    print(f"  speed-up: {before / after:.1f}x (and the bytes are cached by CachedJSON)")
+
+
+if __name__ == "__main__":
+    main()
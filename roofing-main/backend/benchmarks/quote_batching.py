@@ -0,0 +1,139 @@
+"""Throughput and latency of direct vs write-behind quote inserts.
+
+Fires bursts of concurrent inserts through QuoteWriter and reports
+inserts/s plus per-caller p50/p95/p99 for each configuration.
+
+Run from backend/:
+
+    python -m benchmarks.quote_batching --burst 2000 --concurrency 200
+    python -m benchmarks.quote_batching --mongo-url mongodb://localhost:27017
+
+Without --mongo-url the in-memory Mongo stand-in is used, with every call
+delayed by --rtt milliseconds and limited to --pool concurrent calls so the
+round-trip and pool-saturation costs batching removes are still visible.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from typing import List
+
+from benchmarks import harness
+from quote_writer import QuoteWriter, write_concern
+
+
+class SimulatedLatency:
+    """Collection proxy adding a round-trip delay behind a bounded pool"""
+
+    def __init__(self, collection, rtt: float, pool: int):
+        self._collection = collection
+        self._rtt = rtt
+        self._pool = asyncio.Semaphore(pool)
+
+    async def _call(self, name, *args, **kwargs):
+        async with self._pool:
+            await asyncio.sleep(self._rtt)
+            return await getattr(self._collection, name)(*args, **kwargs)
+
+    async def insert_one(self, *args, **kwargs):
+        return await self._call("insert_one", *args, **kwargs)
+
+    async def insert_many(self, *args, **kwargs):
+        return await self._call("insert_many", *args, **kwargs)
+
+    def with_options(self, **kwargs):
+        return self
+
+
+class _Database:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getitem__(self, name):
+        return self._collection
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(writer: QuoteWriter, burst: int, concurrency: int) -> dict:
+    latencies: List[float] = []
+    queue = iter(range(burst))
+
+    async def submitter():
+        for n in queue:
+            doc = {**harness.quote_payload(n), "id": str(uuid.uuid4())}
+            started = time.perf_counter()
+            await writer.insert(doc)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(submitter() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await writer.stop()
+    return {
+        "throughput": burst / elapsed,
+        "p50": statistics.median(latencies) * 1e3,
+        "p95": percentile(latencies, 95) * 1e3,
+        "p99": percentile(latencies, 99) * 1e3,
+    }
+
+
+async def main_async(args) -> None:
+    if args.mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        client = AsyncIOMotorClient(args.mongo_url, maxPoolSize=args.pool)
+        db = client[args.db]
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+
+        client = None
+        db = None
+    concern = write_concern(args.w, args.journal)
+
+    configs = [("direct insert_one", False, 1, 0.0)]
+    for size in args.batch_sizes:
+        configs.append((f"batched size={size} delay={args.delay}ms", True, size, args.delay / 1000))
+
+    print(f"{'mode':<36}{'inserts/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for label, batching, size, delay in configs:
+        if client is not None:
+            await db.bench_quotes.drop()
+            target = db
+            name = "bench_quotes"
+        else:
+            collection = AsyncMongoMockClient()["bench"]["quotes"]
+            target = _Database(SimulatedLatency(collection, args.rtt / 1000, args.pool))
+            name = "quotes"
+        writer = QuoteWriter(
+            target, collection=name, batching=batching, batch_size=size, max_delay=delay, write_concern=concern,
+        )
+        result = await run(writer, args.burst, args.concurrency)
+        print(f"{label:<36}{result['throughput']:>11.0f}{result['p50']:>9.2f}{result['p95']:>9.2f}{result['p99']:>9.2f}")
+
+    if client is not None:
+        await db.bench_quotes.drop()
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--burst", type=int, default=2000, help="inserts per configuration")
+    parser.add_argument("--concurrency", type=int, default=200, help="concurrent submitters")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--delay", type=float, default=5.0, help="write-behind deadline in ms")
+    parser.add_argument("--rtt", type=float, default=1.0, help="simulated round-trip in ms (in-memory mode)")
+    parser.add_argument("--pool", type=int, default=50, help="connection pool size")
+    parser.add_argument("--w", default=None, help="write concern w, e.g. 1 or majority")
+    parser.add_argument("--journal", action="store_true", default=None, help="request j=true")
+    parser.add_argument("--mongo-url", default=None, help="benchmark against a real MongoDB")
+    parser.add_argument("--db", default="roofing_bench")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
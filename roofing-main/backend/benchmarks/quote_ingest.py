@@ -0,0 +1,69 @@
+"""CPU cost of turning a POST /api/quote body into a document and a response.
+
+"before" replays the old submit path: validate QuoteRequestCreate, .dict(),
+re-validate as QuoteRequest, .dict() again, patch created_at to an ISO
+string, then serialize the returned model through response_model.
+"after" is the path used now: validate once, model_dump once, complete the
+document in place and encode the response fields straight from it.
+
+Both include the search keys, which are the same work either way. Mongo
+and email are left out; this is only the per-request Python cost.
+
+Run from backend/:  python -m benchmarks.quote_ingest [--number 20000]
+"""
+import argparse
+import json
+import timeit
+import warnings
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from benchmarks import harness
+from json_response import dumps
+import quote_ingest
+import quote_search
+
+server = harness.server
+
+
+def before(payload: dict, response_adapter: TypeAdapter) -> bytes:
+    input = server.QuoteRequestCreate.model_validate(payload)
+    quote_obj = server.QuoteRequest(**input.dict())
+    quote_dict = quote_obj.dict()
+    quote_dict["created_at"] = quote_obj.created_at.isoformat()
+    quote_dict["search"] = quote_search.search_keys(quote_dict)
+    # FastAPI's response_model handling of the returned QuoteRequest
+    validated = response_adapter.validate_python(quote_obj)
+    encoded = jsonable_encoder(response_adapter.dump_python(validated, mode="json"))
+    return json.dumps(encoded, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def after(payload: dict) -> bytes:
+    quote = server.QuoteRequestCreate.model_validate(payload).model_dump()
+    quote_ingest.build_quote(quote)
+    return dumps(quote_ingest.public(quote))
+
+
+def bench(label: str, fn, number: int) -> float:
+    seconds = timeit.timeit(fn, number=number) / number
+    print(f"  {label:<12}{seconds * 1e6:>10.1f} us/request")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    payload = harness.quote_payload(1)
+    response_adapter = TypeAdapter(server.QuoteRequest)
+    print("POST /api/quote ingestion, excluding I/O")
+    slow = bench("before", lambda: before(payload, response_adapter), args.number)
+    fast = bench("after", lambda: after(payload), args.number)
+    print(f"  speed-up: {slow / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from email_outbox import EmailDeliveryError
+
+logger = logging.getLogger(__name__)
+
+
+def _sdk():
+    """sib_api_v3_sdk is a large generated package; import it on first use, not with the app"""
+    import sib_api_v3_sdk
+
+    return sib_api_v3_sdk
+
+
+class BrevoClient:
+    """Long-lived Brevo (Sendinblue) client.
+
+    One SDK `ApiClient` is built at startup and shared by every send, so its
+    urllib3 pool keeps connections alive between emails. Blocking SDK calls
+    run on a dedicated thread pool sized to match the connection pool, which
+    keeps them off the event loop. `host` can point at a local HTTP stand-in.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        sender_email: Optional[str],
+        sender_name: str = "22G Roofing",
+        host: Optional[str] = None,
+        pool_size: int = 10,
+        timeout: float = 10.0,
+    ):
+        self.api_key = api_key
+        self.sender_email = sender_email
+        self.sender_name = sender_name
+        self.host = host
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._api_client = None
+        self._api = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._start_lock = threading.Lock()
+
+    def start(self) -> None:
+        if self._api is not None:
+            return
+        with self._start_lock:
+            if self._api is not None:
+                return
+            sib_api_v3_sdk = _sdk()
+            configuration = sib_api_v3_sdk.Configuration()
+            configuration.api_key['api-key'] = self.api_key
+            configuration.connection_pool_maxsize = self.pool_size
+            if self.host:
+                configuration.host = self.host
+            self._api_client = sib_api_v3_sdk.ApiClient(configuration)
+            self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="brevo")
+            self._api = sib_api_v3_sdk.TransactionalEmailsApi(self._api_client)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._api_client is not None:
+            self._api_client.rest_client.pool_manager.clear()
+            self._api_client = None
+        self._api = None
+
+    def _send_sync(self, to_email: str, subject: str, html_content: str) -> None:
+        from sib_api_v3_sdk.rest import ApiException
+
+        send_smtp_email = _sdk().SendSmtpEmail(
+            to=[{"email": to_email}],
+            sender={"email": self.sender_email, "name": self.sender_name},
+            subject=subject,
+            html_content=html_content,
+        )
+        try:
+            self._api.send_transac_email(send_smtp_email, _request_timeout=self.timeout)
+        except ApiException as e:
+            logger.error(f"Brevo email error: {e}")
+            raise EmailDeliveryError(f"Brevo rejected email to {to_email}: {e.status}") from e
+
+    async def send(self, to_email: str, subject: str, html_content: str) -> None:
+        """Send one email; raises EmailDeliveryError on failure"""
+        if self._api is None:
+            # First send before startup finished (e.g. lazy startup): the SDK
+            # import and client setup block, so keep them off the event loop
+            await asyncio.to_thread(self.start)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._send_sync, to_email, subject, html_content)
+
+    async def __call__(self, message: dict) -> None:
+        """EmailOutbox transport interface"""
+        await self.send(message["to_email"], message["subject"], message["html_content"])
@@ -0,0 +1,98 @@
+import hashlib
+import threading
+from typing import Any, Callable, Optional
+
+from fastapi import Request, Response
+
+from compression import ENCODINGS, PrecompressedBody
+from json_response import dumps
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def variant_etag(etag: str, encoding: str) -> str:
+    """Strong ETags must differ per content-coding, so tag each variant"""
+    if encoding == "identity":
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against a strong ETag.
+
+    Any encoded variant of the same payload counts as a match.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag or any(candidate == variant_etag(etag, e) for e in ENCODINGS):
+            return True
+    return False
+
+
+class CachedJSON:
+    """Pre-serialized, precompressed JSON payload with a strong ETag.
+
+    The body and its br/gzip variants are built once, either from `loader`
+    or from data pushed in with `set_data()`; they are only rebuilt when
+    the serialized bytes actually change.
+    """
+
+    def __init__(self, loader: Optional[Callable[[], Any]] = None, max_age: int = 3600):
+        self.loader = loader
+        self.max_age = max_age
+        self.body: Optional[bytes] = None
+        self.etag: Optional[str] = None
+        self.compressed: Optional[PrecompressedBody] = None
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def set_data(self, data: Any) -> bool:
+        """Serialize `data`; swap it in only if the bytes changed. Returns True if they did"""
+        body = dumps(data)
+        etag = make_etag(body)
+        if etag == self.etag:
+            return False
+        self.compressed = PrecompressedBody(body)
+        self.body = body
+        self.etag = etag
+        self.version += 1
+        return True
+
+    def get(self):
+        if self.body is None:
+            with self._lock:
+                if self.body is None:
+                    self.set_data(self.loader())
+        return self.body, self.etag
+
+    def refresh(self) -> bool:
+        """Rebuild from the loader; returns True if the payload changed"""
+        with self._lock:
+            return self.set_data(self.loader())
+
+    def headers(self, encoding: str = "identity") -> dict:
+        headers = {
+            "ETag": variant_etag(self.etag, encoding),
+            "Cache-Control": f"public, max-age={self.max_age}",
+            "Vary": "Accept-Encoding",
+        }
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return headers
+
+    def respond(self, request: Request) -> Response:
+        _, etag = self.get()
+        encoding, body = self.compressed.select(request.headers.get("accept-encoding"))
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            headers = self.headers(encoding)
+            headers.pop("Content-Encoding", None)
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=self.headers(encoding))
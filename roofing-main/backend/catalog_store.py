@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import Request, Response
+from pymongo import ReplaceOne, ReturnDocument
+from pymongo.errors import OperationFailure, PyMongoError
+
+from catalog_cache import CachedJSON
+
+logger = logging.getLogger(__name__)
+
+META_COLLECTION = "catalog_meta"
+
+
+class CatalogSection:
+    """How one catalog payload is stored in Mongo and served"""
+
+    def __init__(
+        self,
+        name: str,
+        collection: str,
+        defaults: Callable[[], Any],
+        max_age: int,
+        single: bool = False,
+        model: Optional[type] = None,
+    ):
+        self.name = name
+        self.collection = collection
+        self.defaults = defaults
+        self.max_age = max_age
+        # A single document (contact info) rather than an ordered list
+        self.single = single
+        # Optional pydantic model every written document is validated against
+        self.model = model
+
+    def validate(self, item: Any) -> dict:
+        if self.model is not None and not isinstance(item, self.model):
+            item = self.model(**item)
+        return item.model_dump() if hasattr(item, "model_dump") else dict(item)
+
+
+class CatalogStore:
+    """Mongo-backed catalog fronted by an in-process cache.
+
+    Each section is served from a pre-serialized CachedJSON, so steady-state
+    reads never touch Mongo. Once an entry is older than `ttl` the next
+    request triggers a single background revalidation (stale-while-
+    revalidate): it reads the section's version counter from `catalog_meta`
+    and reloads the documents only if the version moved. A change stream,
+    when the deployment supports one, marks sections stale as soon as they
+    are written. Cold loads are single-flight per section, so a burst of
+    requests on an empty cache causes one Mongo read.
+    """
+
+    def __init__(
+        self,
+        db,
+        sections: List[CatalogSection],
+        ttl: float = 30.0,
+        watch: bool = True,
+        decorate: Optional[Callable[[str, Any], Any]] = None,
+    ):
+        self.db = db
+        self.ttl = ttl
+        self.watch = watch
+        # Applied to freshly loaded data before it is serialized
+        self.decorate = decorate
+        self.sections: Dict[str, CatalogSection] = {section.name: section for section in sections}
+        self.entries: Dict[str, CachedJSON] = {
+            section.name: CachedJSON(max_age=section.max_age) for section in sections
+        }
+        self.versions: Dict[str, Optional[int]] = {name: None for name in self.sections}
+        self.checked_at: Dict[str, float] = {name: 0.0 for name in self.sections}
+        self._locks: Dict[str, asyncio.Lock] = {name: asyncio.Lock() for name in self.sections}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._watcher: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------ writes
+
+    async def seed_defaults(self) -> None:
+        """Populate empty catalog collections from the built-in defaults"""
+        for section in self.sections.values():
+            collection = self.db[section.collection]
+            if await collection.count_documents({}, limit=1):
+                continue
+            await self.save(section.name, section.defaults())
+            logger.info(f"Seeded catalog section {section.name}")
+
+    async def save(self, name: str, data: Any) -> int:
+        """Replace a section's documents and bump its version counter"""
+        section = self.sections[name]
+        collection = self.db[section.collection]
+        if section.single:
+            docs = [{**section.validate(data), "_id": name}]
+        else:
+            docs = [{**section.validate(item), "order": index} for index, item in enumerate(data)]
+            for doc in docs:
+                doc["_id"] = doc["id"]
+        # Upsert in place, then drop leftovers, so readers never see an empty section
+        if docs:
+            await collection.bulk_write([ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in docs])
+        await collection.delete_many({"_id": {"$nin": [doc["_id"] for doc in docs]}})
+        meta = await self.db[META_COLLECTION].find_one_and_update(
+            {"_id": name},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        self.checked_at[name] = 0.0
+        return meta["version"] if meta else 0
+
+    # ------------------------------------------------------------------- reads
+
+    async def _read_version(self, name: str) -> int:
+        meta = await self.db[META_COLLECTION].find_one({"_id": name})
+        return meta.get("version", 0) if meta else 0
+
+    async def _read_documents(self, section: CatalogSection) -> Any:
+        collection = self.db[section.collection]
+        if section.single:
+            doc = await collection.find_one({"_id": section.name}, {"_id": 0})
+            return doc or {}
+        return await collection.find({}, {"_id": 0, "order": 0}).sort("order", 1).to_list(None)
+
+    async def _load(self, name: str, force: bool = False) -> None:
+        section = self.sections[name]
+        version = await self._read_version(name)
+        if force or version != self.versions[name] or self.entries[name].body is None:
+            data = await self._read_documents(section)
+            if self.decorate is not None:
+                data = self.decorate(name, data)
+            if self.entries[name].set_data(data):
+                logger.info(f"Catalog section {name} reloaded (version {version})")
+        self.versions[name] = version
+        self.checked_at[name] = time.monotonic()
+
+    async def _revalidate(self, name: str, force: bool = False) -> None:
+        try:
+            async with self._locks[name]:
+                await self._load(name, force=force)
+        except PyMongoError as e:
+            # Keep serving the stale copy; try again after another ttl
+            self.checked_at[name] = time.monotonic()
+            logger.warning(f"Catalog revalidation of {name} failed: {e}")
+        finally:
+            self._refreshing.pop(name, None)
+
+    def _schedule_revalidate(self, name: str, force: bool = False) -> None:
+        if name not in self._refreshing:
+            self._refreshing[name] = asyncio.create_task(self._revalidate(name, force=force))
+
+    async def entry(self, name: str) -> CachedJSON:
+        entry = self.entries[name]
+        if entry.body is None:
+            async with self._locks[name]:
+                if entry.body is None:
+                    await self._load(name)
+        elif time.monotonic() - self.checked_at[name] > self.ttl:
+            self._schedule_revalidate(name)
+        return entry
+
+    async def respond(self, name: str, request: Request) -> Response:
+        return (await self.entry(name)).respond(request)
+
+    async def warm(self) -> None:
+        for name in self.sections:
+            await self.entry(name)
+
+    # ------------------------------------------------------------ invalidation
+
+    async def _watch(self) -> None:
+        namespaces = [section.collection for section in self.sections.values()] + [META_COLLECTION]
+        by_collection = {section.collection: section.name for section in self.sections.values()}
+        pipeline = [{"$match": {"ns.coll": {"$in": namespaces}}}]
+        try:
+            async with self.db.watch(pipeline) as stream:
+                logger.info("Catalog change stream active")
+                async for change in stream:
+                    collection = change.get("ns", {}).get("coll")
+                    if collection == META_COLLECTION:
+                        name = change.get("documentKey", {}).get("_id")
+                    else:
+                        name = by_collection.get(collection)
+                    if name in self.sections:
+                        self._schedule_revalidate(name, force=True)
+        except (OperationFailure, NotImplementedError) as e:
+            # Standalone servers have no change streams; the ttl poll covers it
+            logger.info(f"Catalog change stream unavailable, relying on version polling: {e}")
+        except asyncio.CancelledError:
+            raise
+        except PyMongoError as e:
+            logger.warning(f"Catalog change stream stopped: {e}")
+
+    def start_watching(self) -> None:
+        if not self.watch:
+            return
+        self._watcher = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        tasks = list(self._refreshing.values())
+        if self._watcher is not None:
+            self._watcher.cancel()
+            tasks.append(self._watcher)
+            self._watcher = None
+        await asyncio.gather(*tasks, return_exceptions=True)
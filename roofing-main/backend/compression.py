@@ -0,0 +1,208 @@
+import gzip
+import time
+import zlib
+from typing import Dict, Optional, Tuple
+
+from metrics import COMPRESSION_CPU_SAVED, COMPRESSION_RESPONSES
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - gzip-only fallback
+    brotli = None
+
+# Preference order when the client accepts several encodings equally
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Responses smaller than this are not worth compressing
+MINIMUM_SIZE = 500
+
+# Content types worth compressing; images, fonts etc. are already compressed
+COMPRESSIBLE_TYPES = {
+    "text/html", "text/css", "text/plain", "text/csv", "text/xml", "application/xml",
+    "application/javascript", "text/javascript", "application/json",
+    "application/x-ndjson", "image/svg+xml", "image/x-icon", "image/vnd.microsoft.icon",
+}
+
+# Precompressed bodies are built once, so use the strongest settings
+STATIC_BROTLI_QUALITY = 11
+STATIC_GZIP_LEVEL = 9
+
+# Streaming compression runs per request, so favour speed
+STREAM_BROTLI_QUALITY = 4
+STREAM_GZIP_LEVEL = 6
+
+
+def negotiate(accept_encoding: Optional[str], available=ENCODINGS) -> str:
+    """Pick the best encoding from an Accept-Encoding header; 'identity' if none"""
+    if not accept_encoding:
+        return "identity"
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+    best, best_q = "identity", 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str, static: bool = True) -> bytes:
+    if encoding == "br":
+        quality = STATIC_BROTLI_QUALITY if static else STREAM_BROTLI_QUALITY
+        return brotli.compress(body, quality=quality)
+    if encoding == "gzip":
+        level = STATIC_GZIP_LEVEL if static else STREAM_GZIP_LEVEL
+        return gzip.compress(body, compresslevel=level, mtime=0)
+    return body
+
+
+def _streaming_cost(body: bytes, encoding: str) -> float:
+    """CPU seconds a per-request compressor would spend on this body"""
+    started = time.process_time()
+    compress(body, encoding, static=False)
+    return time.process_time() - started
+
+
+class PrecompressedBody:
+    """One response body with every encoding built up front.
+
+    Each hit served from here saves the CPU a per-request compressor would
+    have spent, which is measured once at build time and accumulated in
+    the compression_cpu_seconds_saved_total metric.
+    """
+
+    def __init__(self, body: bytes, minimum_size: int = MINIMUM_SIZE):
+        self.variants: Dict[str, bytes] = {"identity": body}
+        self.saved_per_hit: Dict[str, float] = {}
+        if len(body) >= minimum_size:
+            for encoding in ENCODINGS:
+                self.variants[encoding] = compress(body, encoding, static=True)
+                self.saved_per_hit[encoding] = _streaming_cost(body, encoding)
+
+    def select(self, accept_encoding: Optional[str]) -> Tuple[str, bytes]:
+        encoding = negotiate(accept_encoding, tuple(self.variants)) if len(self.variants) > 1 else "identity"
+        COMPRESSION_RESPONSES.inc(encoding, "precompressed")
+        if encoding != "identity":
+            COMPRESSION_CPU_SAVED.inc(encoding, amount=self.saved_per_hit[encoding])
+        return encoding, self.variants[encoding]
+
+
+class _StreamCompressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=STREAM_BROTLI_QUALITY)
+        else:
+            self._zlib = zlib.compressobj(STREAM_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def process(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_FINISH)
+
+
+def _add_vary(headers: list) -> list:
+    for index, (name, value) in enumerate(headers):
+        if name.lower() == b"vary":
+            if b"accept-encoding" not in value.lower():
+                headers[index] = (name, value + b", Accept-Encoding")
+            return headers
+    headers.append((b"vary", b"Accept-Encoding"))
+    return headers
+
+
+class CompressionMiddleware:
+    """Negotiated br/gzip compression for dynamic responses.
+
+    Responses that already carry a Content-Encoding (the precompressed
+    catalog and static bodies) or have a non-compressible content type pass
+    straight through. Small single-chunk bodies are
+    sent as-is; everything else, including streamed NDJSON, is compressed
+    chunk by chunk and flushed so clients see data as it is produced.
+    """
+
+    def __init__(self, app, minimum_size: int = MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = negotiate(accept)
+        if encoding == "identity":
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor: Optional[_StreamCompressor] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                content_type = b""
+                for name, value in headers:
+                    if name.lower() == b"content-type":
+                        content_type = value
+                content_type = content_type.split(b";")[0].strip().decode("latin-1")
+                if (
+                    any(name.lower() == b"content-encoding" for name, _ in headers)
+                    or content_type not in COMPRESSIBLE_TYPES
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = {**message, "headers": headers}
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None and start_message is not None:
+                headers = start_message["headers"]
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    start_message["headers"] = _add_vary(headers)
+                    await send(start_message)
+                    COMPRESSION_RESPONSES.inc("identity", "streamed")
+                    await send(message)
+                    return
+                compressor = _StreamCompressor(encoding)
+                headers = [(n, v) for n, v in headers if n.lower() != b"content-length"]
+                headers.append((b"content-encoding", encoding.encode()))
+                start_message["headers"] = _add_vary(headers)
+                await send(start_message)
+                COMPRESSION_RESPONSES.inc(encoding, "streamed")
+
+            if more_body:
+                chunk = compressor.process(body)
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            else:
+                await send({"type": "http.response.body", "body": compressor.finish(body), "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,111 @@
+import logging
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Required indexes per collection. Names are fixed so re-running at startup is
+# a no-op once they exist.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "quotes": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Newest-first listing and the (created_at, id) keyset cursor
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_desc"),
+        # Admin filters
+        IndexModel(
+            [("service_type", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="service_type_created_at",
+        ),
+        IndexModel([("email", ASCENDING), ("created_at", DESCENDING)], name="email_created_at"),
+        # /api/quotes/search: normalized keys, type-ahead keywords and ranked text
+        IndexModel([("search.phone", ASCENDING), ("created_at", DESCENDING)], name="search_phone"),
+        IndexModel([("search.email", ASCENDING), ("created_at", DESCENDING)], name="search_email"),
+        IndexModel([("search.keywords", ASCENDING), ("created_at", DESCENDING)], name="search_keywords"),
+        IndexModel(
+            [("name", TEXT), ("address", TEXT), ("message", TEXT)],
+            name="quote_text",
+            weights={"name": 10, "address": 5, "message": 1},
+            default_language="english",
+        ),
+        # Copies restored from the archive are removed again once they lapse
+        IndexModel([("rehydrated_until", ASCENDING)], name="rehydrated_until_ttl", expireAfterSeconds=0, sparse=True),
+    ],
+    "email_outbox": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt"),
+        # One message per quote and kind, however often it is queued
+        IndexModel([("quote_id", ASCENDING), ("kind", ASCENDING)], name="quote_id_kind", unique=True),
+    ],
+    # Counters are keyed by _id; reads filter on period and a start range
+    "quote_stats": [
+        IndexModel([("period", ASCENDING), ("start", ASCENDING)], name="period_start"),
+    ],
+    # Claim documents are keyed by _id; expired claims are removed by TTL
+    "quote_dedupe": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+}
+
+
+def _key(spec) -> tuple:
+    return tuple((field, int(direction) if isinstance(direction, (int, float)) else direction)
+                 for field, direction in spec)
+
+
+async def ensure_indexes(db, indexes: Dict[str, List[IndexModel]] = INDEXES) -> None:
+    """Create every declared index; existing ones are left untouched"""
+    for collection, models in indexes.items():
+        for model in models:
+            try:
+                await db[collection].create_indexes([model])
+            except OperationFailure as e:
+                # e.g. an index with the same keys but different options exists
+                logger.error(f"Could not create index {collection}.{model.document['name']}: {e}")
+
+
+async def index_report(db, indexes: Dict[str, List[IndexModel]] = INDEXES) -> dict:
+    """Compare declared indexes with what exists and what is actually used.
+
+    `missing` are declared but absent, `undeclared` exist but are not
+    declared here, and `unused` have had no accesses since the server last
+    started (from $indexStats).
+    """
+    report = {"missing": [], "undeclared": [], "unused": []}
+    for collection, models in indexes.items():
+        existing = {}
+        async for index in db[collection].list_indexes():
+            existing[_key(index["key"].items())] = index["name"]
+        declared = {_key(model.document["key"].items()): model.document["name"] for model in models}
+
+        # Text indexes are listed under internal keys (_fts, _ftsx), so also match on name
+        existing_names = set(existing.values())
+        declared_names = set(declared.values())
+        for key, name in declared.items():
+            if key not in existing and name not in existing_names:
+                report["missing"].append(f"{collection}.{name}")
+        for key, name in existing.items():
+            if name != "_id_" and key not in declared and name not in declared_names:
+                report["undeclared"].append(f"{collection}.{name}")
+
+        try:
+            async for stats in db[collection].aggregate([{"$indexStats": {}}]):
+                if stats["name"] != "_id_" and stats["accesses"]["ops"] == 0:
+                    report["unused"].append(f"{collection}.{stats['name']}")
+        except (OperationFailure, NotImplementedError) as e:
+            logger.warning(f"$indexStats unavailable for {collection}: {e}")
+    return report
+
+
+async def setup_indexes(db) -> dict:
+    """Startup hook: create declared indexes and log anything out of place"""
+    await ensure_indexes(db)
+    report = await index_report(db)
+    if report["missing"]:
+        logger.warning(f"Missing indexes: {', '.join(report['missing'])}")
+    if report["undeclared"]:
+        logger.info(f"Undeclared indexes: {', '.join(report['undeclared'])}")
+    if report["unused"]:
+        logger.info(f"Indexes unused since server start: {', '.join(report['unused'])}")
+    return report
@@ -0,0 +1,287 @@
+import asyncio
+import logging
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+
+from metrics import record_email_send
+
+logger = logging.getLogger(__name__)
+
+# Outbox message states
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+DEAD = "dead"
+
+
+class EmailDeliveryError(Exception):
+    """Raised by a transport when a message could not be delivered"""
+
+
+# A transport takes an outbox message and raises on failure
+Transport = Callable[[dict], Awaitable[None]]
+
+# Builds the outbox messages for a stored quote
+Composer = Callable[[dict], List[dict]]
+
+DUPLICATE_KEY = 11000
+
+
+class FakeTransport:
+    """In-memory stand-in for Brevo; records messages and can fail on demand"""
+
+    def __init__(self, fail_times: int = 0, delay: float = 0.0):
+        self.fail_times = fail_times
+        self.delay = delay
+        self.sent: List[dict] = []
+        self.attempts = 0
+
+    async def __call__(self, message: dict) -> None:
+        self.attempts += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise EmailDeliveryError("fake transport failure")
+        self.sent.append(message)
+
+
+class EmailOutbox:
+    """Persistent email outbox drained by a pool of background workers.
+
+    Messages live in a Mongo collection next to `quotes`. Workers claim a
+    message with a lease, hand it to the transport and record the outcome;
+    failures are retried with exponential backoff until `max_attempts`, after
+    which the message is dead-lettered. The owning quote's
+    `notifications.<kind>` field mirrors each message's delivery status.
+
+    The quote is written before its messages, so a worker that dies or runs
+    out of time in between leaves notifications pending with nothing queued.
+    With `compose`, a sweeper re-queues those every `sweep_interval` seconds
+    for quotes between `sweep_grace` seconds and `sweep_window` seconds old.
+    Messages are unique per (quote_id, kind), so a sweep racing the request
+    or another worker queues nothing twice.
+    """
+
+    def __init__(
+        self,
+        db,
+        transport: Transport,
+        collection: str = "email_outbox",
+        workers: int = 2,
+        max_attempts: int = 5,
+        base_delay: float = 2.0,
+        max_delay: float = 300.0,
+        lease_seconds: float = 60.0,
+        poll_interval: float = 1.0,
+        compose: Optional[Composer] = None,
+        sweep_interval: float = 60.0,
+        sweep_grace: float = 300.0,
+        sweep_window: float = 86400.0,
+    ):
+        self.db = db
+        self.collection = db[collection]
+        self.transport = transport
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.compose = compose
+        self.sweep_interval = sweep_interval
+        self.sweep_grace = sweep_grace
+        self.sweep_window = sweep_window
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+
+    def message(self, quote_id: str, kind: str, to_email: str, subject: str, html_content: str) -> dict:
+        now = datetime.now(timezone.utc)
+        return {
+            "id": str(uuid.uuid4()),
+            "quote_id": quote_id,
+            "kind": kind,
+            "to_email": to_email,
+            "subject": subject,
+            "html_content": html_content,
+            "status": PENDING,
+            "attempts": 0,
+            "last_error": None,
+            "created_at": now,
+            "next_attempt_at": now,
+            "locked_until": None,
+            "sent_at": None,
+        }
+
+    async def enqueue(self, messages: List[dict]) -> None:
+        if not messages:
+            return
+        try:
+            await self.collection.insert_many(messages, ordered=False)
+        except BulkWriteError as e:
+            # Already queued for that quote and kind, e.g. by the sweeper
+            if any(error["code"] != DUPLICATE_KEY for error in e.details["writeErrors"]):
+                raise
+        self._wakeup.set()
+
+    async def sweep(self, now: Optional[datetime] = None) -> int:
+        """Queue messages for quotes left with pending notifications but none queued.
+
+        Returns the number of messages queued.
+        """
+        if self.compose is None:
+            return 0
+        now = now or datetime.now(timezone.utc)
+        pending = {}
+        cursor = self.db.quotes.find(
+            {
+                "created_at": {
+                    "$gte": now - timedelta(seconds=self.sweep_window),
+                    "$lt": now - timedelta(seconds=self.sweep_grace),
+                },
+                "notifications": {"$exists": True},
+            },
+            {"_id": 0, "id": 1, "notifications": 1},
+        )
+        async for quote in cursor:
+            kinds = {kind for kind, status in quote["notifications"].items() if status == PENDING}
+            if kinds:
+                pending[quote["id"]] = kinds
+        if not pending:
+            return 0
+
+        async for message in self.collection.find(
+            {"quote_id": {"$in": list(pending)}}, {"_id": 0, "quote_id": 1, "kind": 1},
+        ):
+            pending[message["quote_id"]].discard(message["kind"])
+        orphaned = [quote_id for quote_id, kinds in pending.items() if kinds]
+
+        messages = []
+        async for quote in self.db.quotes.find({"id": {"$in": orphaned}}, {"_id": 0}):
+            messages.extend(m for m in self.compose(quote) if m["kind"] in pending[quote["id"]])
+        if messages:
+            logger.warning(f"Queueing {len(messages)} notification(s) that were never queued")
+            await self.enqueue(messages)
+        return len(messages)
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _claim(self) -> Optional[dict]:
+        now = datetime.now(timezone.utc)
+        return await self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": PENDING, "next_attempt_at": {"$lte": now}},
+                    {"status": SENDING, "locked_until": {"$lte": now}},
+                ]
+            },
+            {"$set": {
+                "status": SENDING,
+                "locked_until": now + timedelta(seconds=self.lease_seconds),
+            }},
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _set_quote_status(self, message: dict, status: str) -> None:
+        await self.db.quotes.update_one(
+            {"id": message["quote_id"]},
+            {"$set": {f"notifications.{message['kind']}": status}},
+        )
+
+    async def process(self, message: dict) -> str:
+        """Deliver one claimed message and record the result"""
+        started = time.perf_counter()
+        try:
+            await self.transport(message)
+        except Exception as e:
+            record_email_send(time.perf_counter() - started, ok=False)
+            attempts = message["attempts"] + 1
+            if attempts >= self.max_attempts:
+                status = DEAD
+                update = {"status": DEAD}
+                logger.error(f"Email {message['id']} dead-lettered after {attempts} attempts: {e}")
+            else:
+                status = PENDING
+                next_attempt = datetime.now(timezone.utc) + timedelta(seconds=self.backoff(attempts))
+                update = {"status": PENDING, "next_attempt_at": next_attempt}
+                logger.warning(f"Email {message['id']} failed (attempt {attempts}): {e}")
+            update.update({"attempts": attempts, "last_error": str(e), "locked_until": None})
+            await self.collection.update_one({"id": message["id"]}, {"$set": update})
+            if status == DEAD:
+                await self._set_quote_status(message, DEAD)
+            return status
+
+        record_email_send(time.perf_counter() - started, ok=True)
+        await self.collection.update_one(
+            {"id": message["id"]},
+            {"$set": {
+                "status": SENT,
+                "attempts": message["attempts"] + 1,
+                "sent_at": datetime.now(timezone.utc),
+                "locked_until": None,
+            }},
+        )
+        await self._set_quote_status(message, SENT)
+        logger.info(f"Email sent successfully to {message['to_email']} for quote {message['quote_id']}")
+        return SENT
+
+    async def drain(self) -> int:
+        """Process every message that is currently due; returns the count handled"""
+        handled = 0
+        while True:
+            message = await self._claim()
+            if message is None:
+                return handled
+            await self.process(message)
+            handled += 1
+
+    async def _worker(self) -> None:
+        while not self._stopping:
+            try:
+                handled = await self.drain()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Email outbox worker error: {e}")
+                handled = 0
+            if handled:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _sweeper(self) -> None:
+        while not self._stopping:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Email outbox sweep failed: {e}")
+            await asyncio.sleep(self.sweep_interval)
+
+    def start(self) -> None:
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if self.compose is not None:
+            self._tasks.append(asyncio.create_task(self._sweeper()))
+
+    async def stop(self) -> None:
+        self._stopping = True
+        self._wakeup.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
@@ -0,0 +1,116 @@
+import re
+from functools import lru_cache
+from html import escape
+from pathlib import Path
+from string import Formatter
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+TEMPLATE_DIR = Path(__file__).parent / "templates"
+
+# Shown when an optional quote field is empty
+DEFAULTS = {
+    "address": "N/A",
+    "message": "No additional message",
+}
+
+_BETWEEN_TAGS = re.compile(r">\s+<")
+
+
+def minify(markup: str) -> str:
+    """Drop whitespace between tags; text content is left alone"""
+    return _BETWEEN_TAGS.sub("><", markup)
+
+
+def escape_html(value: str) -> str:
+    """html.escape with a fast path for the common no-special-characters case"""
+    if "&" in value or "<" in value or ">" in value or '"' in value or "'" in value:
+        return escape(value)
+    return value
+
+
+def escape_values(values: Mapping, fields: Iterable[str]) -> Dict[str, str]:
+    """HTML-escape the given fields once, applying DEFAULTS for empty ones"""
+    escaped = {}
+    for field in fields:
+        value = values.get(field)
+        if not value:
+            value = DEFAULTS.get(field, "")
+        escaped[field] = escape_html(str(value))
+    return escaped
+
+
+class CompiledTemplate:
+    """A template split once into static markup and `{field}` slots.
+
+    Rendering only escapes the fields and joins the pieces, so the static
+    parts are never re-formatted or re-concatenated per email.
+    """
+
+    def __init__(self, source: str, minified: bool = False):
+        statics: List[str] = []
+        fields: List[str] = []
+        for literal, field, _, _ in Formatter().parse(source):
+            statics.append(minify(literal) if minified else literal)
+            if field is not None:
+                fields.append(field)
+        tail = statics.pop() if len(statics) > len(fields) else ""
+        if minified:
+            if statics:
+                statics[0] = statics[0].lstrip()
+            tail = tail.rstrip()
+        self.pairs: Tuple[Tuple[str, str], ...] = tuple(zip(statics, fields))
+        self.tail = tail
+        self.fields = frozenset(fields)
+
+    def render_escaped(self, escaped: Mapping[str, str]) -> str:
+        parts = []
+        append = parts.append
+        for literal, field in self.pairs:
+            append(literal)
+            append(escaped[field])
+        append(self.tail)
+        return "".join(parts)
+
+    def __call__(self, values: Mapping) -> str:
+        return self.render_escaped(escape_values(values, self.fields))
+
+
+@lru_cache(maxsize=None)
+def get_template(name: str, minified: bool = True) -> CompiledTemplate:
+    """Load and compile a template from TEMPLATE_DIR once per process"""
+    source = (TEMPLATE_DIR / f"{name}.html").read_text(encoding="utf-8")
+    return CompiledTemplate(source, minified=minified)
+
+
+def render(name: str, values: Mapping, minified: bool = True) -> str:
+    return get_template(name, minified)(values)
+
+
+def render_batch(name: str, items: Iterable[Mapping], minified: bool = True) -> List[str]:
+    """Render many notifications with a single template lookup"""
+    template = get_template(name, minified)
+    return [template(values) for values in items]
+
+
+def render_quote_emails_batch(quotes: Iterable[Mapping]) -> List[Dict[str, str]]:
+    """Render both notifications for many quotes in one pass.
+
+    Templates are resolved once for the whole batch and each quote's fields
+    are escaped once for both emails.
+    """
+    admin = get_template("admin_quote_email")
+    customer = get_template("customer_quote_email")
+    fields = admin.fields | customer.fields
+    rendered = []
+    for quote in quotes:
+        escaped = escape_values(quote, fields)
+        rendered.append({
+            "admin": admin.render_escaped(escaped),
+            "customer": customer.render_escaped(escaped),
+        })
+    return rendered
+
+
+def render_quote_emails(quote: Mapping) -> Dict[str, str]:
+    """HTML bodies for both quote notifications, keyed by recipient kind"""
+    return render_quote_emails_batch([quote])[0]
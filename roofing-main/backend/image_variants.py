@@ -0,0 +1,260 @@
+import asyncio
+import hashlib
+import importlib.util
+import io
+import logging
+import os
+import threading
+import urllib.request
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+logger = logging.getLogger(__name__)
+
+# Pillow is imported on first use so it stays off the app's import path
+ENABLED = importlib.util.find_spec("PIL") is not None
+
+# Widths offered in srcset; requests for anything else are rejected
+WIDTHS = (320, 640, 960, 1280, 1920)
+DEFAULT_WIDTH = 960
+
+QUALITY = {"avif": 50, "webp": 75, "jpeg": 80}
+MEDIA_TYPES = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg"}
+
+# Upper bound on a fetched source image
+MAX_SOURCE_BYTES = 25 * 1024 * 1024
+
+
+def available_formats() -> Tuple[str, ...]:
+    """Best first; JPEG is always there as the <img> fallback"""
+    if not ENABLED:
+        return ()
+    from PIL import features
+
+    formats = [fmt for fmt in ("avif", "webp") if features.check(fmt)]
+    return tuple(formats) + ("jpeg",)
+
+
+def image_key(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+
+
+def resize(data: bytes, width: int, fmt: str) -> bytes:
+    """Downscale to `width` (never up), honour EXIF rotation, drop metadata"""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+        if fmt == "jpeg" and image.mode != "RGB":
+            image = image.convert("RGB")
+        elif image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        out = io.BytesIO()
+        if fmt == "jpeg":
+            image.save(out, "JPEG", quality=QUALITY[fmt], optimize=True, progressive=True)
+        elif fmt == "webp":
+            image.save(out, "WEBP", quality=QUALITY[fmt], method=4)
+        else:
+            image.save(out, "AVIF", quality=QUALITY[fmt], speed=6)
+        return out.getvalue()
+
+
+class HTTPFetcher:
+    """Fetches source images over HTTP(S) in a worker thread"""
+
+    def __init__(self, timeout: float = 15.0, max_bytes: int = MAX_SOURCE_BYTES):
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+
+    def _fetch(self, url: str) -> bytes:
+        request = urllib.request.Request(url, headers={"User-Agent": "22g-roofing-images/1.0"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            data = response.read(self.max_bytes + 1)
+        if len(data) > self.max_bytes:
+            raise ValueError(f"Source image larger than {self.max_bytes} bytes: {url}")
+        return data
+
+    async def __call__(self, url: str) -> bytes:
+        return await asyncio.to_thread(self._fetch, url)
+
+
+class LocalFetcher:
+    """Resolves a source URL to a file in `directory` by its last path segment.
+
+    Used for development and tests so nothing is fetched from the network.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+
+    async def __call__(self, url: str) -> bytes:
+        name = unquote(urlparse(url).path.rsplit("/", 1)[-1])
+        return await asyncio.to_thread((self.directory / name).read_bytes)
+
+
+class DiskLRU:
+    """Files in one directory, evicted least-recently-used above `max_bytes`.
+
+    Recency survives restarts through the files' mtime, which is bumped on
+    every hit. Methods do blocking file I/O, so call them from a worker
+    thread (ImagePipeline uses asyncio.to_thread); the index is guarded by
+    a lock.
+
+    The index lives in this process only. With several worker processes on
+    one directory each keeps its own accounting, so the directory can grow
+    to N x `max_bytes`; size IMAGE_CACHE_MAX_MB for that.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        files = [path for path in self.directory.iterdir() if path.is_file() and not path.name.endswith(".tmp")]
+        for path in sorted(files, key=lambda p: p.stat().st_mtime):
+            self._entries[path.name] = path.stat().st_size
+            self.size += self._entries[path.name]
+        self._evict()
+
+    def get(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            if name not in self._entries:
+                return None
+        path = self.directory / name
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted meanwhile, here or by another worker process
+            with self._lock:
+                self.size -= self._entries.pop(name, 0)
+            return None
+        with self._lock:
+            if name in self._entries:
+                self._entries.move_to_end(name)
+        return data
+
+    def put(self, name: str, data: bytes) -> None:
+        path = self.directory / name
+        # Unique per writer: other workers may be storing the same variant
+        tmp = path.with_name(f"{name}.{os.getpid()}-{uuid.uuid4().hex[:8]}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self.size += len(data) - self._entries.pop(name, 0)
+            self._entries[name] = len(data)
+            self._evict()
+
+    def _evict(self) -> None:
+        while self.size > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self.size -= size
+            (self.directory / name).unlink(missing_ok=True)
+
+
+class ImagePipeline:
+    """Resized, recompressed variants of catalog images.
+
+    Only URLs registered from the catalog can be requested, addressed by a
+    hash of the URL. Sources and variants share one on-disk LRU; concurrent
+    requests for the same file share one fetch or encode, and encoding runs
+    in worker threads limited to `workers` at a time.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_bytes: int,
+        fetcher: Callable[[str], Awaitable[bytes]],
+        widths: Tuple[int, ...] = WIDTHS,
+        formats: Optional[Tuple[str, ...]] = None,
+        workers: int = 2,
+        base_path: str = "/api/images",
+    ):
+        self.cache = DiskLRU(cache_dir, max_bytes)
+        self.fetcher = fetcher
+        self.widths = widths
+        self._formats = formats
+        self.base_path = base_path
+        self.sources: Dict[str, str] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._workers = asyncio.Semaphore(workers)
+
+    @property
+    def formats(self) -> Tuple[str, ...]:
+        if self._formats is None:
+            self._formats = available_formats()
+        return self._formats
+
+    def register(self, url: str) -> str:
+        key = image_key(url)
+        self.sources[key] = url
+        return key
+
+    def srcset(self, url: str) -> dict:
+        """`image` block for a catalog item: fallback src plus one srcset per format"""
+        key = self.register(url)
+        base = f"{self.base_path}/{key}"
+        default = min(self.widths, key=lambda w: abs(w - DEFAULT_WIDTH))
+        return {
+            "src": f"{base}/{default}.jpeg",
+            "srcset": {
+                fmt: ", ".join(f"{base}/{width}.{fmt} {width}w" for width in self.widths)
+                for fmt in self.formats
+            },
+        }
+
+    def decorate(self, section: str, data: Any) -> Any:
+        """CatalogStore hook: attach srcset data to every item with an image_url"""
+        if not isinstance(data, list):
+            return data
+        return [
+            {**item, "image": self.srcset(item["image_url"])} if item.get("image_url") else item
+            for item in data
+        ]
+
+    async def _single_flight(self, name: str, produce: Callable[[], Awaitable[bytes]]) -> bytes:
+        cached = await asyncio.to_thread(self.cache.get, name)
+        if cached is not None:
+            return cached
+        pending = self._inflight.get(name)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[name] = future
+        try:
+            data = await produce()
+            await asyncio.to_thread(self.cache.put, name, data)
+            future.set_result(data)
+            return data
+        except BaseException as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; don't log "exception never retrieved"
+            future.exception()
+            raise
+        finally:
+            del self._inflight[name]
+
+    async def source(self, key: str) -> bytes:
+        url = self.sources[key]
+        return await self._single_flight(f"{key}.src", lambda: self.fetcher(url))
+
+    async def variant(self, key: str, width: int, fmt: str) -> bytes:
+        """Bytes of one variant; KeyError for unknown keys, widths or formats"""
+        if key not in self.sources or width not in self.widths or fmt not in self.formats:
+            raise KeyError(f"{key}/{width}.{fmt}")
+
+        async def produce() -> bytes:
+            data = await self.source(key)
+            async with self._workers:
+                return await asyncio.to_thread(resize, data, width, fmt)
+
+        return await self._single_flight(f"{key}-{width}.{fmt}", produce)
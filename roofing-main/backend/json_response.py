@@ -0,0 +1,54 @@
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
+# FAST_JSON=0 forces the stdlib encoder even when orjson is installed
+USE_ORJSON = orjson is not None and os.environ.get("FAST_JSON", "1") != "0"
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.isoformat()
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _orjson_default(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON; datetimes are encoded natively (naive ones as UTC)"""
+    if USE_ORJSON:
+        return orjson.dumps(value, default=_orjson_default, option=_ORJSON_OPTIONS)
+    return json.dumps(
+        value,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+        default=_default,
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class: orjson when available, stdlib otherwise"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
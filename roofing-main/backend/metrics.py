@@ -0,0 +1,288 @@
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+# Latency buckets in seconds, shared by every histogram
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0.0)
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, labels)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, *labels, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def expose(self) -> List[str]:
+        lines = super().expose()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is a bisect plus two additions"""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labels) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _format_labels(self.labels, labels, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def expose(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by route, method and status", ("route", "method", "status")))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("route", "method")))
+MONGO_LATENCY = REGISTRY.register(Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency", ("collection", "command")))
+MONGO_FAILURES = REGISTRY.register(Counter(
+    "mongo_command_failures_total", "Failed MongoDB commands", ("collection", "command")))
+MONGO_CHECKOUT_WAIT = REGISTRY.register(Histogram(
+    "mongo_pool_checkout_wait_seconds", "Time spent waiting for a pooled MongoDB connection"))
+MONGO_CHECKOUT_FAILURES = REGISTRY.register(Counter(
+    "mongo_pool_checkout_failures_total", "Failed MongoDB connection checkouts", ("reason",)))
+EMAIL_LATENCY = REGISTRY.register(Histogram(
+    "email_send_duration_seconds", "Brevo send latency by outcome", ("outcome",)))
+EMAIL_FAILURES = REGISTRY.register(Counter(
+    "email_send_failures_total", "Failed Brevo sends"))
+LOOP_LAG = REGISTRY.register(Histogram(
+    "event_loop_lag_seconds", "Delay between a scheduled and an actual event loop wake-up"))
+LOOP_LAG_LAST = REGISTRY.register(Gauge(
+    "event_loop_lag_last_seconds", "Most recent event loop lag sample"))
+
+COMPRESSION_RESPONSES = REGISTRY.register(Counter(
+    "compression_responses_total", "Responses by content-coding and how they were compressed",
+    ("encoding", "mode")))
+COMPRESSION_CPU_SAVED = REGISTRY.register(Counter(
+    "compression_cpu_seconds_saved_total",
+    "CPU seconds not spent because a precompressed body was served", ("encoding",)))
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording per-route request counts and latency.
+
+    Requests are labelled with the matched route template (e.g. /api/quotes),
+    never the raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app, prefix: str = "/api"):
+        self.app = app
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = scope.get("route")
+            path = getattr(route, "path", None)
+            if path is None or not path.startswith(self.prefix):
+                path = "other"
+            method = scope["method"]
+            HTTP_LATENCY.observe(elapsed, path, method)
+            HTTP_REQUESTS.inc(path, method, str(status))
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Times every command the driver sends, labelled by collection"""
+
+    def __init__(self):
+        self._collections: Dict[Tuple[int, int], str] = {}
+
+    def started(self, event):
+        value = event.command.get(event.command_name)
+        if not isinstance(value, str):
+            # e.g. getMore, whose value is the cursor id
+            value = event.command.get("collection", "")
+        self._collections[(event.request_id, event.operation_id)] = value
+
+    def _collection(self, event) -> str:
+        return self._collections.pop((event.request_id, event.operation_id), "")
+
+    def succeeded(self, event):
+        MONGO_LATENCY.observe(event.duration_micros / 1e6, self._collection(event), event.command_name)
+
+    def failed(self, event):
+        collection = self._collection(event)
+        MONGO_LATENCY.observe(event.duration_micros / 1e6, collection, event.command_name)
+        MONGO_FAILURES.inc(collection, event.command_name)
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Measures connection checkout wait.
+
+    Checkout start and finish are reported on the same driver thread, so the
+    start time is kept in a thread-local.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        if started is not None:
+            MONGO_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+            self._local.started = None
+
+    def connection_check_out_failed(self, event):
+        self._local.started = None
+        MONGO_CHECKOUT_FAILURES.inc(str(event.reason))
+
+    # The remaining pool events are not needed
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_created(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): pass
+    def connection_checked_in(self, event): pass
+
+
+def mongo_listeners() -> list:
+    return [MongoCommandListener(), MongoPoolListener()]
+
+
+def record_email_send(elapsed: float, ok: bool) -> None:
+    EMAIL_LATENCY.observe(elapsed, "sent" if ok else "failed")
+    if not ok:
+        EMAIL_FAILURES.inc()
+
+
+class LoopLagMonitor:
+    """Samples event loop lag by sleeping for a fixed interval and measuring overshoot"""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            LOOP_LAG.observe(lag)
+            LOOP_LAG_LAST.set(value=lag)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+QUOTE_BATCH_SIZE = REGISTRY.register(Histogram(
+    "quote_insert_batch_size", "Quotes persisted per write-behind insert_many",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500)))
+
+STARTUP_PHASES = REGISTRY.register(Gauge(
+    "app_startup_phase_seconds", "Duration of each import and startup phase", ("phase",)))
+
+ADMISSION_IN_FLIGHT = REGISTRY.register(Gauge(
+    "admission_in_flight", "Requests holding an admission slot", ("limit",)))
+ADMISSION_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "admission_queue_depth", "Requests waiting for an admission slot", ("limit",)))
+ADMISSION_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "admission_queue_wait_seconds", "Time from arrival to admission", ("limit",)))
+ADMISSION_SHED = REGISTRY.register(Counter(
+    "admission_shed_total", "Requests answered 503 instead of being served", ("limit", "reason")))
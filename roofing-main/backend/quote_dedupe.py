@@ -0,0 +1,195 @@
+import asyncio
+import contextvars
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import List, Mapping, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Fields that make two submissions "the same request"
+FINGERPRINT_FIELDS = ("name", "email", "phone", "service_type", "address", "message")
+
+
+def fingerprint(data: Mapping) -> str:
+    """Stable hash of a submission's normalized content"""
+    parts = []
+    for field in FINGERPRINT_FIELDS:
+        value = data.get(field) or ""
+        parts.append(" ".join(str(value).split()).lower())
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class IdempotencyKeyReused(Exception):
+    """Raised when an Idempotency-Key is sent again with different content"""
+
+
+class _LRU:
+    """Small bounded LRU of claim key -> (expires_at, quote document)"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[dict]:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires_at, quote = item
+        if expires_at <= time.time():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return quote
+
+    def put(self, key: str, quote: dict, ttl: float) -> None:
+        self._items[key] = (time.time() + ttl, quote)
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        self._items.pop(key, None)
+
+
+class QuoteDeduplicator:
+    """Suppress duplicate quote submissions.
+
+    A submission is identified by its content fingerprint and, when sent,
+    its Idempotency-Key header; it is a duplicate if either is already
+    claimed. The in-process LRU answers repeats
+    seen by this worker; the `quote_dedupe` collection (unique `_id`, TTL on
+    `expires_at`) makes the claim atomic across workers.
+
+    Claims also record the content fingerprint, so a key reused for a
+    different submission raises IdempotencyKeyReused instead of replaying
+    someone else's quote.
+    """
+
+    def __init__(
+        self,
+        db,
+        collection: str = "quote_dedupe",
+        fingerprint_window: float = 600.0,
+        key_ttl: float = 86400.0,
+        lru_size: int = 10000,
+        settle_seconds: float = 60.0,
+    ):
+        self.db = db
+        self.collection = db[collection]
+        self.fingerprint_window = fingerprint_window
+        self.key_ttl = key_ttl
+        self.settle_seconds = settle_seconds
+        self._settling: set = set()
+        self.cache = _LRU(lru_size)
+
+    def claim_keys(self, data: Mapping, idempotency_key: Optional[str]) -> List[Tuple[str, float]]:
+        """(claim key, ttl seconds) pairs for a submission.
+
+        The content fingerprint is always claimed, after the Idempotency-Key
+        when one is sent, so a client that sends a fresh key on every retry
+        is still caught within the fingerprint window.
+        """
+        keys = [(f"fp:{fingerprint(data)}", self.fingerprint_window)]
+        if idempotency_key:
+            keys.insert(0, (f"key:{idempotency_key}", self.key_ttl))
+        return keys
+
+    def cached(self, keys: List[Tuple[str, float]], data: Mapping) -> Optional[dict]:
+        for key, _ in keys:
+            quote = self.cache.get(key)
+            if quote is not None:
+                if fingerprint(quote) != fingerprint(data):
+                    raise IdempotencyKeyReused(key)
+                return quote
+        return None
+
+    async def claim(self, keys: List[Tuple[str, float]], quote_id: str, data: Mapping) -> Optional[str]:
+        """Claim every key for a new quote with content `data`.
+
+        Returns None if the claims succeeded, or the id of the quote that
+        already holds one of them; keys claimed before that one are pointed
+        at it. Raises IdempotencyKeyReused if that quote's content differs.
+        """
+        for index, (key, ttl) in enumerate(keys):
+            existing_id = await self._claim(key, quote_id, ttl, data)
+            if existing_id is not None:
+                for earlier, _ in keys[:index]:
+                    await self.collection.update_one(
+                        {"_id": earlier, "quote_id": quote_id}, {"$set": {"quote_id": existing_id}},
+                    )
+                return existing_id
+        return None
+
+    async def _claim(self, key: str, quote_id: str, ttl: float, data: Mapping) -> Optional[str]:
+        now = datetime.now(timezone.utc)
+        content = fingerprint(data)
+        claim = {"_id": key, "quote_id": quote_id, "fingerprint": content, "expires_at": now + timedelta(seconds=ttl)}
+        try:
+            await self.collection.insert_one(claim)
+            return None
+        except DuplicateKeyError:
+            pass
+
+        # TTL deletion runs about once a minute, so take over stale claims here
+        taken = await self.collection.find_one_and_update(
+            {"_id": key, "expires_at": {"$lte": now}},
+            {"$set": {"quote_id": quote_id, "fingerprint": content, "expires_at": claim["expires_at"]}},
+        )
+        if taken is not None:
+            return None
+        existing = await self.collection.find_one({"_id": key})
+        if existing is None:
+            # Claim expired and was removed between the two calls; try again
+            return await self._claim(key, quote_id, ttl, data)
+        # Claims written before fingerprints were stored are trusted as before
+        if existing.get("fingerprint", content) != content:
+            raise IdempotencyKeyReused(key)
+        return existing["quote_id"]
+
+    async def release(self, keys: List[Tuple[str, float]], quote_id: str) -> None:
+        """Drop the claims of a quote that was never stored"""
+        for key, _ in keys:
+            self.cache.discard(key)
+        await self.collection.delete_many({"_id": {"$in": [key for key, _ in keys]}, "quote_id": quote_id})
+
+    def settle(self, keys: List[Tuple[str, float]], quote_id: str) -> None:
+        """Hold the claims of an insert whose outcome is unknown.
+
+        The quote may have been stored (write concern error, timeout), so
+        releasing now would let a retry insert it twice. The claims are kept
+        and checked again after `settle_seconds`: they are released only if
+        the quote still is not there, and otherwise live out their TTL so
+        retries replay the stored quote.
+        """
+        for key, _ in keys:
+            self.cache.discard(key)
+        task = asyncio.create_task(self._settle(keys, quote_id), context=contextvars.Context())
+        self._settling.add(task)
+        task.add_done_callback(self._settling.discard)
+
+    async def _settle(self, keys: List[Tuple[str, float]], quote_id: str) -> None:
+        await asyncio.sleep(self.settle_seconds)
+        try:
+            if await self.db.quotes.find_one({"id": quote_id}, {"_id": 1}) is None:
+                await self.release(keys, quote_id)
+        except PyMongoError as e:
+            # The claims still lapse with their TTL
+            logger.warning(f"Could not settle the claims of quote {quote_id}: {e}")
+
+    async def original(self, quote_id: str, attempts: int = 5, delay: float = 0.05) -> Optional[dict]:
+        """Load the stored quote for a duplicate, waiting briefly for an in-flight insert"""
+        for _ in range(attempts):
+            quote = await self.db.quotes.find_one({"id": quote_id}, {"_id": 0})
+            if quote is not None:
+                return quote
+            await asyncio.sleep(delay)
+        return None
+
+    def remember(self, keys: List[Tuple[str, float]], quote: dict) -> None:
+        for key, ttl in keys:
+            self.cache.put(key, quote, ttl)
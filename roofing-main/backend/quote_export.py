@@ -0,0 +1,241 @@
+"""Streaming bulk export of quotes as CSV or NDJSON, optionally gzipped.
+
+Quotes are read oldest first, ordered by (created_at, id), straight off a
+Motor cursor and encoded a chunk of rows at a time, so memory stays flat
+however large the collection is. Every chunk ends at a resume point: the
+(created_at, id) of its last row. With gzip each chunk is a complete gzip
+member; concatenated members are a valid .gz file, so an interrupted
+export can be truncated back to its last whole chunk and continued.
+
+CSV cells that a spreadsheet would evaluate as a formula are prefixed
+with a single quote: any cell starting with =, @, tab or CR, and cells
+starting with + or - unless they are a plain number or phone number such
+as "+61 448 046 461" or "-12.5".
+
+From backend/:
+
+    python quote_export.py --format csv --gzip --output quotes.csv.gz
+    python quote_export.py --format csv --gzip --output quotes.csv.gz --resume
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import re
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator, List, Optional, Tuple
+
+from json_response import dumps
+from quote_queries import QUOTE_FIELDS, created_at_value
+
+EXPORT_SORT = [("created_at", 1), ("id", 1)]
+FORMATS = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+ResumeKey = Tuple[str, str]
+
+
+def build_filter(
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    after: Optional[ResumeKey] = None,
+) -> dict:
+    clauses: List[dict] = []
+    date_range = {}
+    if created_from is not None:
+        date_range["$gte"] = created_at_value(created_from)
+    if created_to is not None:
+        date_range["$lt"] = created_at_value(created_to)
+    if date_range:
+        clauses.append({"created_at": date_range})
+    if after is not None:
+        created_at = created_at_value(datetime.fromisoformat(after[0]))
+        clauses.append({"$or": [
+            {"created_at": {"$gt": created_at}},
+            {"created_at": created_at, "id": {"$gt": after[1]}},
+        ]})
+    if not clauses:
+        return {}
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def _text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        # Motor returns naive UTC datetimes
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.isoformat()
+    return str(value)
+
+
+# Spreadsheets evaluate cells starting with these as formulas
+_FORMULA_PREFIXES = ("=", "@", "\t", "\r")
+# + and - also start formulas, but with only digits and phone punctuation
+# after them there is nothing to call
+_SIGNED_NUMBER = re.compile(r"^[+-][\d\s().\-]*\d[\d\s().\-]*$")
+
+
+def _cell(value) -> str:
+    """CSV text for a field, quoted with ' if a spreadsheet would run it as a formula"""
+    text = _text(value)
+    if text.startswith(_FORMULA_PREFIXES) or (text[:1] in ("+", "-") and not _SIGNED_NUMBER.match(text)):
+        return "'" + text
+    return text
+
+
+class _Encoder:
+    def __init__(self, fmt: str, header: bool):
+        self.fmt = fmt
+        self._buffer = io.StringIO()
+        self._csv = csv.writer(self._buffer, lineterminator="\r\n") if fmt == "csv" else None
+        self._parts: List[bytes] = []
+        if header and self._csv is not None:
+            self._csv.writerow(QUOTE_FIELDS)
+
+    def add(self, doc: dict) -> None:
+        if self._csv is not None:
+            self._csv.writerow([_cell(doc.get(field)) for field in QUOTE_FIELDS])
+        else:
+            self._parts.append(dumps(doc) + b"\n")
+
+    def take(self) -> bytes:
+        if self._csv is not None:
+            data = self._buffer.getvalue().encode("utf-8")
+            self._buffer.seek(0)
+            self._buffer.truncate()
+            return data
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _gzip_member(data: bytes) -> bytes:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+async def export_chunks(
+    collection,
+    fmt: str = "csv",
+    query: Optional[dict] = None,
+    gzip: bool = False,
+    header: bool = True,
+    batch_size: int = 2000,
+    chunk_rows: int = 5000,
+) -> AsyncIterator[Tuple[bytes, Optional[ResumeKey]]]:
+    """Yield (encoded chunk, resume key of its last row)"""
+    fields = {"_id": 0, **{name: 1 for name in QUOTE_FIELDS}}
+    cursor = collection.find(query or {}, fields).sort(EXPORT_SORT).batch_size(batch_size)
+    encoder = _Encoder(fmt, header)
+    rows = 0
+    last: Optional[ResumeKey] = None
+    async for doc in cursor:
+        encoder.add(doc)
+        last = (_text(doc["created_at"]), doc["id"])
+        rows += 1
+        if rows >= chunk_rows:
+            data = encoder.take()
+            yield (_gzip_member(data) if gzip else data), last
+            rows = 0
+    data = encoder.take()
+    if data or (gzip and last is None):
+        yield (_gzip_member(data) if gzip else data), last
+
+
+async def stream(collection, fmt: str, query: dict, gzip: bool, batch_size: int) -> AsyncIterator[bytes]:
+    """Response body for the export endpoint"""
+    async for data, _ in export_chunks(collection, fmt, query, gzip=gzip, batch_size=batch_size):
+        yield data
+
+
+def filename(fmt: str, gzip: bool) -> str:
+    return f"quotes-{datetime.now():%Y%m%d-%H%M%S}.{fmt}" + (".gz" if gzip else "")
+
+
+async def export_file(
+    collection,
+    output: Path,
+    fmt: str,
+    gzip: bool,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    resume: bool = False,
+    batch_size: int = 2000,
+) -> int:
+    """Write an export to `output`; returns the bytes written.
+
+    Progress is checkpointed to `<output>.resume` after every chunk. With
+    `resume`, the output is truncated to the last checkpoint and the export
+    continues after the row recorded there.
+    """
+    state_path = output.with_name(output.name + ".resume")
+    after: Optional[ResumeKey] = None
+    offset = 0
+    if resume and state_path.exists():
+        state = json.loads(state_path.read_text())
+        offset = state["offset"]
+        after = tuple(state["after"])
+        # The date range is part of the export being resumed
+        created_from = datetime.fromisoformat(state["from"]) if state["from"] else None
+        created_to = datetime.fromisoformat(state["to"]) if state["to"] else None
+
+    query = build_filter(created_from, created_to, after)
+    with open(output, "r+b" if offset else "wb") as out:
+        out.truncate(offset)
+        out.seek(offset)
+        written = 0
+        async for data, last in export_chunks(collection, fmt, query, gzip=gzip, header=not offset, batch_size=batch_size):
+            out.write(data)
+            out.flush()
+            os.fsync(out.fileno())
+            written += len(data)
+            if last is not None:
+                state_path.write_text(json.dumps({
+                    "offset": offset + written,
+                    "after": list(last),
+                    "from": created_from.isoformat() if created_from else None,
+                    "to": created_to.isoformat() if created_to else None,
+                }))
+    state_path.unlink(missing_ok=True)
+    return offset + written
+
+
+async def _export(args) -> None:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / ".env")
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    size = await export_file(
+        client[os.environ["DB_NAME"]].quotes,
+        Path(args.output),
+        args.format,
+        args.gzip,
+        created_from=args.created_from,
+        created_to=args.created_to,
+        resume=args.resume,
+        batch_size=args.batch_size,
+    )
+    print(f"Wrote {size} bytes to {args.output}")
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--from", dest="created_from", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--to", dest="created_to", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted export of the same file")
+    parser.add_argument("--batch-size", type=int, default=2000)
+    asyncio.run(_export(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
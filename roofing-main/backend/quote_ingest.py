@@ -0,0 +1,99 @@
+"""Single-pass ingestion for POST /api/quote.
+
+The body is validated once, by FastAPI, into QuoteRequestCreate, and dumped
+once. `build_quote` turns that dict into the Mongo document in place, and
+the response is picked from the same document by `public`, so no second
+model is built and nothing is re-validated on the way out.
+
+`created_at` is stored as a BSON date. It is truncated to milliseconds,
+the precision BSON dates keep, so the stored value, the response and the
+keyset cursors all name the same instant.
+
+Quotes stored before this held ISO-string timestamps. Range queries and
+sorting only compare values of the same BSON type, so convert them, from
+backend/:
+
+    python quote_ingest.py migrate-created-at
+"""
+import argparse
+import asyncio
+import os
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List
+
+from pymongo import UpdateOne
+
+from quote_queries import QUOTE_FIELDS
+from quote_search import search_keys
+
+
+def utc_now() -> datetime:
+    """Current UTC time at BSON date precision"""
+    now = datetime.now(timezone.utc)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+def build_quote(fields: dict) -> dict:
+    """Complete validated request fields into the stored document (in place)"""
+    fields["id"] = str(uuid.uuid4())
+    fields["created_at"] = utc_now()
+    fields["search"] = search_keys(fields)
+    return fields
+
+
+def public(doc: dict) -> dict:
+    """The QuoteRequest fields of a stored document, as returned by the API"""
+    return {name: doc.get(name) for name in QUOTE_FIELDS}
+
+
+def parse_created_at(value: str) -> datetime:
+    created_at = datetime.fromisoformat(value)
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at.astimezone(timezone.utc)
+
+
+async def migrate_created_at(collection, batch_size: int = 1000) -> int:
+    """Rewrite string created_at values as dates; returns the number converted"""
+    converted = 0
+    updates: List[UpdateOne] = []
+    async for doc in collection.find({"created_at": {"$type": "string"}}, {"created_at": 1}).batch_size(batch_size):
+        # Matching on the old value leaves a quote alone if it changed meanwhile
+        updates.append(UpdateOne(
+            {"_id": doc["_id"], "created_at": doc["created_at"]},
+            {"$set": {"created_at": parse_created_at(doc["created_at"])}},
+        ))
+        if len(updates) >= batch_size:
+            await collection.bulk_write(updates, ordered=False)
+            converted += len(updates)
+            updates = []
+    if updates:
+        await collection.bulk_write(updates, ordered=False)
+        converted += len(updates)
+    return converted
+
+
+async def _migrate() -> None:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / ".env")
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    converted = await migrate_created_at(client[os.environ["DB_NAME"]].quotes)
+    print(f"Converted created_at to a date on {converted} quotes")
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("migrate-created-at", help="convert ISO-string created_at values to dates")
+    args = parser.parse_args()
+    if args.command == "migrate-created-at":
+        asyncio.run(_migrate())
+
+
+if __name__ == "__main__":
+    main()
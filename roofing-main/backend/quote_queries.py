@@ -0,0 +1,97 @@
+import base64
+import json
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from json_response import dumps
+
+# Fields a caller may ask for via `fields=`; id and created_at are always
+# returned because the keyset cursor is built from them.
+QUOTE_FIELDS = ("id", "name", "email", "phone", "service_type", "address", "message", "created_at")
+CURSOR_FIELDS = ("id", "created_at")
+SORT = [("created_at", -1), ("id", -1)]
+
+
+def created_at_value(value: datetime) -> datetime:
+    """Value of `created_at` as stored in Mongo (a UTC date), for comparisons"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def encode_cursor(doc: dict) -> str:
+    created_at = doc["created_at"]
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    raw = json.dumps([created_at, doc["id"]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, quote_id = json.loads(base64.urlsafe_b64decode(padded))
+        return created_at_value(datetime.fromisoformat(created_at)), str(quote_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def projection(fields: Optional[str]) -> dict:
+    if not fields:
+        return {"_id": 0, **{name: 1 for name in QUOTE_FIELDS}}
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(QUOTE_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return {"_id": 0, **{name: 1 for name in requested | set(CURSOR_FIELDS)}}
+
+
+def build_filter(
+    service_type: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    after: Optional[str] = None,
+) -> dict:
+    clauses: List[dict] = []
+    if service_type:
+        clauses.append({"service_type": service_type})
+    date_range = {}
+    if created_from is not None:
+        date_range["$gte"] = created_at_value(created_from)
+    if created_to is not None:
+        date_range["$lt"] = created_at_value(created_to)
+    if date_range:
+        clauses.append({"created_at": date_range})
+    if after:
+        created_at, quote_id = decode_cursor(after)
+        clauses.append({"$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": quote_id}},
+        ]})
+    if not clauses:
+        return {}
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
+
+
+async def fetch_page(collection, query: dict, fields: dict, limit: int) -> Tuple[List[dict], Optional[str]]:
+    """Fetch one keyset page; returns the docs and the cursor for the next page"""
+    cursor = collection.find(query, fields).sort(SORT).limit(limit + 1)
+    docs = await cursor.to_list(limit + 1)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1])
+    return docs, next_cursor
+
+
+async def stream_ndjson(collection, query: dict, fields: dict, batch_size: int, limit: int = 0) -> AsyncIterator[bytes]:
+    """Yield documents straight off the Motor cursor, one JSON line each"""
+    cursor = collection.find(query, fields).sort(SORT).batch_size(batch_size)
+    if limit:
+        cursor = cursor.limit(limit)
+    async for doc in cursor:
+        yield dumps(doc) + b"\n"
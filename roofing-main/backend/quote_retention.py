@@ -0,0 +1,460 @@
+"""Tiered retention for quotes: hot in Mongo, archived on disk, then expired.
+
+Quotes older than `archive_after_months` are moved out of `db.quotes`, a
+chunk at a time, oldest first, into gzipped NDJSON files partitioned by UTC
+day:
+
+    <archive_dir>/quotes/date=2024-05-03/part-<hash>.ndjson.gz
+    <archive_dir>/quotes/date=2024-05-03/part-<hash>.ndjson.gz.sha256
+
+`archive_dir` (RETENTION_ARCHIVE_DIR) has no default: archived quotes exist
+only there, so it must be durable storage that every worker and host sees.
+
+A part is written to a temporary file, fsynced and renamed, then read back
+and checked against its SHA-256 and the ids it should hold; only then are
+those quotes deleted from Mongo. Part names are derived from the ids they
+contain, so a pass interrupted between the write and the delete rewrites
+the same file on the next run instead of archiving the quotes twice.
+
+The job runs in the background of every worker, but a lease in `job_leases`
+lets only one of them archive at a time. It is throttled to a duty cycle
+(by default it sleeps nine times as long as each chunk took) and pauses
+while `busy()` reports live traffic queueing for admission. The lease is
+renewed throughout those pauses and checked again before every delete; a
+worker that finds it taken over stops its pass.
+
+With `ttl_days`, a TTL index on `created_at` deletes quotes past that age
+outright, and archive partitions past it are removed by the job.
+
+Quotes still holding ISO-string timestamps are neither archived (the
+cutoff is compared as a date) nor expired (the TTL monitor only acts on
+dates). Each pass logs how many remain; convert them with
+`python quote_ingest.py migrate-created-at`.
+
+Rehydrating copies an archived date range back into `db.quotes` with a
+`rehydrated_until` date; the `rehydrated_until_ttl` index removes the
+copies again, and the archive job never re-archives them.
+
+From backend/:
+
+    python quote_retention.py archive
+    python quote_retention.py rehydrate --from 2024-01-01 --to 2024-01-31
+    python quote_retention.py verify
+"""
+import argparse
+import asyncio
+import calendar
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import socket
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ASCENDING, IndexModel, UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from json_response import dumps
+from quote_export import EXPORT_SORT
+from quote_ingest import parse_created_at
+from quote_queries import created_at_value
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = "date="
+LEASE_ID = "quote_retention"
+TTL_INDEX = "created_at_ttl"
+
+
+class ArchiveCorrupt(ValueError):
+    """An archive part does not match its checksum or expected contents"""
+
+
+class LeaseLost(Exception):
+    """Another worker holds the archival lease; the pass must stop"""
+
+
+def months_ago(now: datetime, months: int) -> datetime:
+    """Same day and time `months` calendar months earlier, clamped to month end"""
+    index = now.year * 12 + now.month - 1 - months
+    year, month = divmod(index, 12)
+    day = min(now.day, calendar.monthrange(year, month + 1)[1])
+    return now.replace(year=year, month=month + 1, day=day)
+
+
+def day_of(created_at) -> str:
+    """UTC day (YYYY-MM-DD) of a stored created_at value"""
+    if isinstance(created_at, datetime):
+        if created_at.tzinfo is not None:
+            created_at = created_at.astimezone(timezone.utc)
+        return created_at.date().isoformat()
+    return datetime.fromisoformat(str(created_at)).astimezone(timezone.utc).date().isoformat()
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _read_part(path: Path) -> List[dict]:
+    """Decoded documents of one part, after checking it against its .sha256 file"""
+    data = path.read_bytes()
+    checksum_file = path.with_name(path.name + ".sha256")
+    try:
+        expected = checksum_file.read_text().split()[0]
+    except (FileNotFoundError, IndexError):
+        raise ArchiveCorrupt(f"{path}: missing checksum")
+    if _sha256(data) != expected:
+        raise ArchiveCorrupt(f"{path}: checksum mismatch")
+    return [json.loads(line) for line in gzip.decompress(data).splitlines() if line]
+
+
+def _write_part(directory: Path, docs: List[dict]) -> Path:
+    """Durably write one part and verify it; returns its path"""
+    ids = [doc["id"] for doc in docs]
+    name = "part-" + _sha256("\n".join(ids).encode())[:16] + ".ndjson.gz"
+    path = directory / name
+    # mtime=0 keeps the bytes, and so the checksum, identical on a rewrite
+    data = gzip.compress(b"".join(dumps(doc) + b"\n" for doc in docs), mtime=0)
+    checksum = _sha256(data)
+
+    directory.mkdir(parents=True, exist_ok=True)
+    # Unique per writer, so two writers never share a half-written file
+    suffix = f".{os.getpid()}-{uuid.uuid4().hex[:8]}.tmp"
+    tmp = path.with_name(name + suffix)
+    with open(tmp, "wb") as out:
+        out.write(data)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp, path)
+    checksum_file = path.with_name(name + ".sha256")
+    tmp = checksum_file.with_name(checksum_file.name + suffix)
+    tmp.write_text(f"{checksum}  {name}\n")
+    os.replace(tmp, checksum_file)
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+    stored = [doc["id"] for doc in _read_part(path)]
+    if stored != ids:
+        raise ArchiveCorrupt(f"{path}: holds {len(stored)} quotes, expected {len(ids)}")
+    return path
+
+
+class QuoteArchiver:
+    """Moves old quotes to the on-disk archive and back again on request"""
+
+    def __init__(
+        self,
+        db,
+        archive_dir: Optional[Path],
+        archive_after_months: int = 0,
+        ttl_days: int = 0,
+        rehydrate_days: int = 7,
+        chunk_size: int = 500,
+        duty_cycle: float = 0.1,
+        busy: Optional[Callable[[], bool]] = None,
+        interval: float = 3600.0,
+        lease_seconds: float = 600.0,
+        collection: str = "quotes",
+    ):
+        if ttl_days and archive_after_months and ttl_days <= archive_after_months * 31:
+            raise ValueError("ttl_days must be longer than the archive horizon, or quotes expire unarchived")
+        if archive_after_months and archive_dir is None:
+            # Archived quotes are gone from Mongo; they must land somewhere durable
+            raise ValueError("Set RETENTION_ARCHIVE_DIR to durable storage shared by every worker to archive quotes")
+        self.db = db
+        self.collection = db[collection]
+        self.root = Path(archive_dir) / collection if archive_dir is not None else None
+        self.archive_after_months = archive_after_months
+        self.ttl_days = ttl_days
+        self.rehydrate_days = rehydrate_days
+        self.chunk_size = chunk_size
+        self.duty_cycle = duty_cycle
+        self.busy = busy
+        self.interval = interval
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._task: Optional[asyncio.Task] = None
+        self._lease_renewed = 0.0
+
+    # --------------------------------------------------------------- indexes
+
+    async def ensure_ttl_index(self) -> None:
+        """Create, retune or drop the optional TTL index to match ttl_days"""
+        existing = None
+        async for index in self.collection.list_indexes():
+            if index["name"] == TTL_INDEX:
+                existing = index
+        if not self.ttl_days:
+            if existing is not None:
+                await self.collection.drop_index(TTL_INDEX)
+            return
+        seconds = self.ttl_days * 86400
+        if existing is None:
+            await self.collection.create_indexes([
+                IndexModel([("created_at", ASCENDING)], name=TTL_INDEX, expireAfterSeconds=seconds),
+            ])
+        elif existing.get("expireAfterSeconds") != seconds:
+            await self.db.command({
+                "collMod": self.collection.name,
+                "index": {"name": TTL_INDEX, "expireAfterSeconds": seconds},
+            })
+
+    # ----------------------------------------------------------------- lease
+
+    async def _take_lease(self) -> bool:
+        now = datetime.now(timezone.utc)
+        until = now + timedelta(seconds=self.lease_seconds)
+        try:
+            await self.db.job_leases.update_one(
+                {"_id": LEASE_ID, "$or": [{"locked_until": {"$lte": now}}, {"owner": self.owner}]},
+                {"$set": {"owner": self.owner, "locked_until": until}},
+                upsert=True,
+            )
+            self._lease_renewed = time.monotonic()
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def _renew_lease(self, force: bool = True) -> None:
+        """Extend the lease, or raise LeaseLost if another worker took it over"""
+        if not force and time.monotonic() - self._lease_renewed < self.lease_seconds / 4:
+            return
+        if not await self._take_lease():
+            raise LeaseLost(f"archival lease taken over from {self.owner}")
+
+    async def _drop_lease(self) -> None:
+        await self.db.job_leases.delete_one({"_id": LEASE_ID, "owner": self.owner})
+
+    # --------------------------------------------------------------- archive
+
+    def partition(self, day: str) -> Path:
+        return self.root / f"{PARTITION_PREFIX}{day}"
+
+    def cutoff(self, now: Optional[datetime] = None) -> datetime:
+        return months_ago(now or datetime.now(timezone.utc), self.archive_after_months)
+
+    async def archive_chunk(self, cutoff: datetime, before_delete: Optional[Callable[[], Awaitable[None]]] = None) -> int:
+        """Archive the oldest chunk of quotes created before `cutoff`; returns how many.
+
+        `before_delete` runs once the parts are verified and may raise to keep
+        the quotes in Mongo.
+        """
+        query = {"created_at": {"$lt": created_at_value(cutoff)}, "rehydrated_until": {"$exists": False}}
+        cursor = self.collection.find(query, {"_id": 0}).sort(EXPORT_SORT).limit(self.chunk_size)
+        docs = await cursor.to_list(self.chunk_size)
+        if not docs:
+            return 0
+        by_day: Dict[str, List[dict]] = {}
+        for doc in docs:
+            by_day.setdefault(day_of(doc["created_at"]), []).append(doc)
+        for day, group in by_day.items():
+            await asyncio.to_thread(_write_part, self.partition(day), group)
+        if before_delete is not None:
+            await before_delete()
+        result = await self.collection.delete_many({
+            "id": {"$in": [doc["id"] for doc in docs]},
+            "rehydrated_until": {"$exists": False},
+        })
+        return result.deleted_count
+
+    async def _throttle(self, elapsed: float) -> None:
+        pause = elapsed * (1 - self.duty_cycle) / self.duty_cycle
+        # Sleep in steps well inside the lease so it never lapses meanwhile
+        step = self.lease_seconds / 4
+        while pause > 0:
+            await asyncio.sleep(min(pause, step))
+            pause -= step
+            await self._renew_lease(force=False)
+        while self.busy is not None and self.busy():
+            await asyncio.sleep(1.0)
+            await self._renew_lease(force=False)
+
+    def prune_expired(self, now: Optional[datetime] = None) -> int:
+        """Delete archive partitions older than ttl_days; returns how many"""
+        if not self.ttl_days or self.root is None or not self.root.exists():
+            return 0
+        horizon = ((now or datetime.now(timezone.utc)) - timedelta(days=self.ttl_days)).date().isoformat()
+        removed = 0
+        for directory in sorted(self.root.glob(f"{PARTITION_PREFIX}*")):
+            if directory.name[len(PARTITION_PREFIX):] < horizon:
+                shutil.rmtree(directory)
+                removed += 1
+        return removed
+
+    async def unmigrated(self) -> int:
+        """Quotes whose created_at is still a string, which no pass can archive"""
+        return await self.collection.count_documents({"created_at": {"$type": "string"}})
+
+    async def run_once(self) -> dict:
+        """One archival pass, if this worker holds the lease"""
+        if not await self._take_lease():
+            return {"archived": 0, "pruned": 0, "skipped": True}
+        archived = 0
+        cutoff = self.cutoff()
+        try:
+            unmigrated = await self.unmigrated()
+            if unmigrated:
+                logger.warning(
+                    f"{unmigrated} quotes have a string created_at and are never archived or expired; "
+                    f"run `python quote_ingest.py migrate-created-at`"
+                )
+            while True:
+                started = time.monotonic()
+                await self._renew_lease()
+                count = await self.archive_chunk(cutoff, before_delete=self._renew_lease)
+                if not count:
+                    break
+                archived += count
+                await self._throttle(time.monotonic() - started)
+            await self._renew_lease()
+            pruned = await asyncio.to_thread(self.prune_expired)
+        except LeaseLost as e:
+            logger.warning(f"Stopped archiving after {archived} quotes: {e}")
+            return {"archived": archived, "pruned": 0, "skipped": False, "lease_lost": True}
+        finally:
+            await self._drop_lease()
+        if archived or pruned:
+            logger.info(f"Archived {archived} quotes older than {cutoff.date()}, pruned {pruned} partitions")
+        return {"archived": archived, "pruned": pruned, "skipped": False}
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Quote archival failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self.archive_after_months:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    # ------------------------------------------------------------- rehydrate
+
+    def parts(self, start: date, end: date) -> Dict[str, List[Path]]:
+        """Archive parts for each UTC day start..end, inclusive"""
+        days = {}
+        day = start
+        while day <= end:
+            days[day.isoformat()] = sorted(self.partition(day.isoformat()).glob("part-*.ndjson.gz"))
+            day += timedelta(days=1)
+        return days
+
+    async def rehydrate(self, start: date, end: date, batch_size: int = 500) -> dict:
+        """Copy archived quotes for start..end back into Mongo for rehydrate_days.
+
+        Days with no archive partition are listed in `missing_days`: either
+        nothing was archived for them or this host cannot see the archive.
+        """
+        until = datetime.now(timezone.utc) + timedelta(days=self.rehydrate_days)
+        restored = 0
+        days = await asyncio.to_thread(self.parts, start, end)
+        missing_days = [day for day, paths in days.items() if not paths]
+        for path in (path for paths in days.values() for path in paths):
+            docs = await asyncio.to_thread(_read_part, path)
+            for doc in docs:
+                # NDJSON holds timestamps as ISO strings; store them as dates again
+                doc["created_at"] = parse_created_at(doc["created_at"])
+            for offset in range(0, len(docs), batch_size):
+                batch = docs[offset:offset + batch_size]
+                # Never touch a quote that is still live; extend earlier copies
+                updates = [
+                    UpdateOne({"id": doc["id"]}, {"$setOnInsert": {**doc, "rehydrated_until": until}}, upsert=True)
+                    for doc in batch
+                ]
+                updates.append(UpdateMany(
+                    {"id": {"$in": [doc["id"] for doc in batch]}, "rehydrated_until": {"$lt": until}},
+                    {"$set": {"rehydrated_until": until}},
+                ))
+                await self.collection.bulk_write(updates, ordered=False)
+                restored += len(batch)
+        return {"restored": restored, "rehydrated_until": until, "missing_days": missing_days}
+
+    def verify(self) -> List[str]:
+        """Check every part against its checksum; returns the problems found"""
+        problems = []
+        if self.root is None:
+            return problems
+        for path in sorted(self.root.glob(f"{PARTITION_PREFIX}*/part-*.ndjson.gz")):
+            try:
+                _read_part(path)
+            except (ArchiveCorrupt, OSError, ValueError) as e:
+                problems.append(str(e))
+        return problems
+
+
+def archiver_from_env(db, busy: Optional[Callable[[], bool]] = None) -> QuoteArchiver:
+    env = os.environ.get
+    return QuoteArchiver(
+        db,
+        Path(env("RETENTION_ARCHIVE_DIR")) if env("RETENTION_ARCHIVE_DIR") else None,
+        archive_after_months=int(env("RETENTION_ARCHIVE_MONTHS", "0")),
+        ttl_days=int(env("RETENTION_TTL_DAYS", "0")),
+        rehydrate_days=int(env("RETENTION_REHYDRATE_DAYS", "7")),
+        chunk_size=int(env("RETENTION_CHUNK_SIZE", "500")),
+        duty_cycle=float(env("RETENTION_DUTY_CYCLE", "0.1")),
+        interval=float(env("RETENTION_INTERVAL", "3600")),
+        busy=busy,
+    )
+
+
+async def _command(args) -> None:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / ".env")
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    archiver = archiver_from_env(client[os.environ["DB_NAME"]])
+    try:
+        if args.command == "archive":
+            if not archiver.archive_after_months:
+                raise SystemExit("Set RETENTION_ARCHIVE_MONTHS to archive")
+            print(await archiver.run_once())
+        elif args.command == "rehydrate":
+            if archiver.root is None:
+                raise SystemExit("Set RETENTION_ARCHIVE_DIR to rehydrate")
+            result = await archiver.rehydrate(args.start, args.end)
+            print(f"Restored {result['restored']} quotes until {result['rehydrated_until']:%Y-%m-%d %H:%M} UTC")
+            if result["missing_days"]:
+                print(f"No archive partition for: {', '.join(result['missing_days'])}")
+        elif args.command == "verify":
+            if archiver.root is None:
+                raise SystemExit("Set RETENTION_ARCHIVE_DIR to verify")
+            problems = await asyncio.to_thread(archiver.verify)
+            print("\n".join(problems) or "All archive parts verified")
+            if problems:
+                raise SystemExit(1)
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("archive", help="run one archival pass now")
+    rehydrate = commands.add_parser("rehydrate", help="copy an archived date range back into Mongo")
+    rehydrate.add_argument("--from", dest="start", type=date.fromisoformat, required=True)
+    rehydrate.add_argument("--to", dest="end", type=date.fromisoformat, required=True)
+    commands.add_parser("verify", help="check every archive part against its checksum")
+    asyncio.run(_command(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Search over quote requests: ranked full-text and prefix type-ahead.
+
+Each quote carries a `search` subdocument written on insert:
+
+    {"phone": "0448046461", "email": "jo@example.com", "keywords": ["jo", "smith", ...]}
+
+Phone numbers are reduced to digits in national form and emails are
+lowercased, so lookups by either are exact (or prefix) matches on an
+index. `keywords` holds the folded words of name, address and message; an
+anchored regex on that multikey index answers type-ahead, which the text
+index cannot. Full-word queries go through the `quote_text` text index and
+are ranked by its score. A bare number too short to be a whole phone
+number (a postcode, a street number, the start of a phone) is looked up in
+both `phone` and `keywords`.
+
+Add the keys to quotes stored before this existed, from backend/:
+
+    python quote_search.py backfill
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import re
+import unicodedata
+from pathlib import Path
+from typing import Iterable, List, Mapping, Optional, Tuple
+
+from fastapi import HTTPException
+from pymongo import UpdateOne
+
+from quote_queries import QUOTE_FIELDS, SORT
+
+MAX_KEYWORDS = 100
+MIN_KEYWORD_LENGTH = 2
+# Deeper pages than this are better served by narrowing the query
+MAX_OFFSET = 1000
+
+_WORD = re.compile(r"[a-z0-9]+")
+_PHONE_CHARS = re.compile(r"^[\d\s+()\-.]+$")
+# Fewest digits in a whole phone number (a local number without area code)
+MIN_PHONE_DIGITS = 8
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip accents"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+def words(text: Optional[str]) -> List[str]:
+    return _WORD.findall(fold(text)) if text else []
+
+
+def normalize_phone(phone: Optional[str]) -> str:
+    """Digits in national form: +61 448 046 461 and 0448 046 461 both become 0448046461.
+
+    Works on partial numbers too, so type-ahead on "+61 448" matches.
+    """
+    phone = (phone or "").strip()
+    digits = re.sub(r"\D", "", phone)
+    if digits.startswith("0061"):
+        return "0" + digits[4:]
+    if digits.startswith("61") and (phone.startswith("+") or len(digits) == 11):
+        return "0" + digits[2:]
+    return digits
+
+
+def normalize_email(email: Optional[str]) -> str:
+    return (email or "").strip().lower()
+
+
+def keywords(values: Iterable[Optional[str]]) -> List[str]:
+    seen = {}
+    for value in values:
+        for word in words(value):
+            if len(word) >= MIN_KEYWORD_LENGTH:
+                seen.setdefault(word, None)
+    return list(seen)[:MAX_KEYWORDS]
+
+
+def search_keys(quote: Mapping) -> dict:
+    """The `search` subdocument stored with a quote"""
+    return {
+        "phone": normalize_phone(quote.get("phone")),
+        "email": normalize_email(quote.get("email")),
+        "keywords": keywords((quote.get("name"), quote.get("address"), quote.get("message"))),
+    }
+
+
+def encode_offset(offset: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"o": offset}).encode()).decode().rstrip("=")
+
+
+def decode_offset(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        offset = int(json.loads(base64.urlsafe_b64decode(padded))["o"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not 0 <= offset <= MAX_OFFSET:
+        raise HTTPException(status_code=400, detail="Cursor out of range")
+    return offset
+
+
+def classify(q: str) -> Tuple[str, str]:
+    """('email' | 'phone' | 'number' | 'words', normalized query)"""
+    q = q.strip()
+    if "@" in q:
+        return "email", normalize_email(q)
+    digits = re.sub(r"\D", "", q)
+    if q.isdigit() and len(digits) < MIN_PHONE_DIGITS:
+        return "number", digits
+    if _PHONE_CHARS.match(q) and len(digits) >= 3:
+        return "phone", normalize_phone(q)
+    return "words", q
+
+
+def build_query(q: str, prefix: bool) -> Tuple[dict, bool]:
+    """Mongo filter for `q`, and whether results are ranked by text score"""
+    kind, value = classify(q)
+    match = {"$regex": "^" + re.escape(value)} if prefix else value
+    if kind in ("email", "phone"):
+        return {f"search.{kind}": match}, False
+    if kind == "number":
+        return {"$or": [{"search.phone": match}, {"search.keywords": match}]}, False
+
+    terms = words(value)
+    if not terms:
+        raise HTTPException(status_code=400, detail="Query has no searchable words")
+    if not prefix:
+        return {"$text": {"$search": " ".join(terms)}}, True
+    # Type-ahead: every complete word must match, the last one as a prefix.
+    # Words too short to be stored as keywords can only narrow as the prefix.
+    clauses = [{"search.keywords": term} for term in terms[:-1] if len(term) >= MIN_KEYWORD_LENGTH]
+    clauses.append({"search.keywords": {"$regex": "^" + re.escape(terms[-1])}})
+    return (clauses[0] if len(clauses) == 1 else {"$and": clauses}), False
+
+
+async def search(
+    collection,
+    q: str,
+    prefix: bool = False,
+    limit: int = 20,
+    after: Optional[str] = None,
+    service_type: Optional[str] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """One page of matches and the cursor for the next page, if any"""
+    offset = decode_offset(after)
+    query, ranked = build_query(q, prefix)
+    if service_type:
+        query = {"$and": [query, {"service_type": service_type}]}
+    fields = {"_id": 0, **{name: 1 for name in QUOTE_FIELDS}}
+    if ranked:
+        fields["score"] = {"$meta": "textScore"}
+        sort = [("score", {"$meta": "textScore"})] + SORT
+    else:
+        sort = SORT
+    cursor = collection.find(query, fields).sort(sort).skip(offset).limit(limit + 1)
+    docs = await cursor.to_list(limit + 1)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        if offset + limit <= MAX_OFFSET:
+            next_cursor = encode_offset(offset + limit)
+    return docs, next_cursor
+
+
+async def backfill(collection, batch_size: int = 1000) -> int:
+    """Add `search` keys to every quote missing them; returns the number updated"""
+    fields = {"_id": 1, "name": 1, "email": 1, "phone": 1, "address": 1, "message": 1}
+    updated = 0
+    updates: List[UpdateOne] = []
+    async for doc in collection.find({"search": {"$exists": False}}, fields).batch_size(batch_size):
+        updates.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"search": search_keys(doc)}}))
+        if len(updates) >= batch_size:
+            await collection.bulk_write(updates, ordered=False)
+            updated += len(updates)
+            updates = []
+    if updates:
+        await collection.bulk_write(updates, ordered=False)
+        updated += len(updates)
+    return updated
+
+
+async def _backfill() -> None:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / ".env")
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    updated = await backfill(client[os.environ["DB_NAME"]].quotes)
+    print(f"Added search keys to {updated} quotes")
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("backfill", help="add search keys to quotes stored without them")
+    args = parser.parse_args()
+    if args.command == "backfill":
+        asyncio.run(_backfill())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""Pre-aggregated quote counts per service_type per day and per week.
+
+Every submission `$inc`s one day and one week counter document, so reading
+the stats costs O(buckets) rather than a scan of `quotes`. Days and weeks
+(starting Monday) are calendar periods in STATS_TIMEZONE.
+
+Rebuild the counters from the quotes collection, e.g. after first deploying
+this, from backend/:
+
+    python quote_stats.py backfill [--prune]
+
+Archived quotes are no longer in the collection, and rehydrated copies are
+only there for a while, so with RETENTION_ARCHIVE_MONTHS set the backfill
+leaves every day up to the archive cutoff, and any week that starts before
+it, as counted at submission time. `--prune` never deletes those either.
+"""
+import argparse
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ("day", "week")
+
+
+def bucket_id(period: str, start: date, service_type: str) -> str:
+    return f"{period}|{start.isoformat()}|{service_type}"
+
+
+def period_start(day: date, period: str) -> date:
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+class QuoteStats:
+    """Counter documents in `quote_stats`:
+    {_id, period, start (YYYY-MM-DD), service_type, count}
+    """
+
+    def __init__(self, db, collection: str = "quote_stats", tz: str = "Australia/Sydney"):
+        self.db = db
+        self.collection = db[collection]
+        self.tz_name = tz
+        self.tz = ZoneInfo(tz)
+
+    def local_day(self, created_at: datetime) -> date:
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        return created_at.astimezone(self.tz).date()
+
+    def _increments(self, day: date, service_type: str, count: int) -> List[UpdateOne]:
+        # inserted_at lets a backfill tell buckets created while it ran from stale ones
+        inserted_at = datetime.now(timezone.utc)
+        updates = []
+        for period in PERIODS:
+            start = period_start(day, period)
+            updates.append(UpdateOne(
+                {"_id": bucket_id(period, start, service_type)},
+                {
+                    "$inc": {"count": count},
+                    "$setOnInsert": {
+                        "period": period,
+                        "start": start.isoformat(),
+                        "service_type": service_type,
+                        "inserted_at": inserted_at,
+                    },
+                },
+                upsert=True,
+            ))
+        return updates
+
+    async def record(self, service_type: str, created_at: datetime) -> None:
+        """Count one new quote; failures are logged, a backfill repairs them"""
+        try:
+            await self.collection.bulk_write(
+                self._increments(self.local_day(created_at), service_type, 1), ordered=False,
+            )
+        except Exception as e:
+            logger.warning(f"Quote stats update failed: {e}")
+
+    async def query(
+        self,
+        period: str = "day",
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        service_type: Optional[str] = None,
+    ) -> List[dict]:
+        """Counters for `period` with start in [start, end], oldest first"""
+        query: dict = {"period": period}
+        bounds = {}
+        if start is not None:
+            bounds["$gte"] = period_start(start, period).isoformat()
+        if end is not None:
+            bounds["$lte"] = end.isoformat()
+        if bounds:
+            query["start"] = bounds
+        if service_type:
+            query["service_type"] = service_type
+        cursor = self.collection.find(
+            query, {"_id": 0, "start": 1, "service_type": 1, "count": 1},
+        ).sort([("start", 1), ("service_type", 1)])
+        return [
+            {"start": doc["start"], "service_type": doc["service_type"], "count": doc["count"]}
+            async for doc in cursor
+        ]
+
+    # ---------------------------------------------------------------- backfill
+
+    def backfill_pipeline(self) -> List[dict]:
+        """Quotes grouped by local calendar day and service_type, on the server.
+
+        $toDate accepts both ISO-string and BSON-date created_at values.
+        """
+        return [
+            {"$project": {
+                "_id": 0,
+                "service_type": 1,
+                "day": {"$dateToString": {
+                    "format": "%Y-%m-%d",
+                    "date": {"$toDate": "$created_at"},
+                    "timezone": self.tz_name,
+                }},
+            }},
+            {"$group": {"_id": {"day": "$day", "service_type": "$service_type"}, "count": {"$sum": 1}}},
+        ]
+
+    async def backfill(
+        self, quotes, prune: bool = False, batch_size: int = 1000, since: Optional[date] = None,
+    ) -> Tuple[int, int]:
+        """Rebuild every counter from `quotes`; returns (quotes counted, buckets written).
+
+        Day groups are streamed from the aggregation cursor and written in
+        batches; week totals are summed from them as they arrive, so memory
+        is bounded by the number of weeks, not quotes. Quotes submitted while
+        the backfill runs can be counted twice, so run it while traffic is quiet.
+
+        With `since`, only days from `since` on, and weeks starting then or
+        later, are rebuilt or pruned; older buckets are left untouched.
+        `prune` only deletes buckets that existed before the run started.
+        """
+        now = datetime.now(timezone.utc)
+        # At BSON date precision, so stored markers compare exactly
+        run = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        weeks: Dict[Tuple[date, str], int] = defaultdict(int)
+        updates: List[UpdateOne] = []
+        counted = written = 0
+
+        async def write(pending: List[UpdateOne]) -> int:
+            if pending:
+                await self.collection.bulk_write(pending, ordered=False)
+            return len(pending)
+
+        cursor = quotes.aggregate(self.backfill_pipeline(), allowDiskUse=True, batchSize=batch_size)
+        async for group in cursor:
+            day = date.fromisoformat(group["_id"]["day"])
+            if since is not None and day < since:
+                continue
+            service_type = group["_id"]["service_type"]
+            counted += group["count"]
+            weeks[(period_start(day, "week"), service_type)] += group["count"]
+            updates.append(self._set(bucket_id("day", day, service_type), "day", day, service_type, group["count"], run))
+            if len(updates) >= batch_size:
+                written += await write(updates)
+                updates = []
+
+        for (start, service_type), count in weeks.items():
+            if since is not None and start < since:
+                # Part of this week may be archived; keep the submit-time count
+                continue
+            updates.append(self._set(bucket_id("week", start, service_type), "week", start, service_type, count, run))
+            if len(updates) >= batch_size:
+                written += await write(updates)
+                updates = []
+        written += await write(updates)
+
+        if prune:
+            # Buckets with no quotes left behind them; ones a submission
+            # created during the run are not in this rebuild but are live
+            stale: dict = {
+                "rebuilt_at": {"$ne": run},
+                "$or": [{"inserted_at": {"$exists": False}}, {"inserted_at": {"$lt": run}}],
+            }
+            if since is not None:
+                stale["start"] = {"$gte": since.isoformat()}
+            await self.collection.delete_many(stale)
+        return counted, written
+
+    @staticmethod
+    def _set(bucket: str, period: str, start: date, service_type: str, count: int, run: datetime) -> UpdateOne:
+        return UpdateOne(
+            {"_id": bucket},
+            {"$set": {
+                "period": period,
+                "start": start.isoformat(),
+                "service_type": service_type,
+                "count": count,
+                "rebuilt_at": run,
+            }},
+            upsert=True,
+        )
+
+
+async def _backfill(prune: bool) -> None:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / ".env")
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    db = client[os.environ["DB_NAME"]]
+    stats = QuoteStats(db, tz=os.environ.get("STATS_TIMEZONE", "Australia/Sydney"))
+    since = None
+    archive_months = int(os.environ.get("RETENTION_ARCHIVE_MONTHS", "0"))
+    if archive_months:
+        from quote_retention import months_ago
+
+        # The cutoff's own day may be partly archived already
+        since = stats.local_day(months_ago(datetime.now(timezone.utc), archive_months)) + timedelta(days=1)
+    counted, written = await stats.backfill(db.quotes, prune=prune, since=since)
+    print(f"Counted {counted} quotes into {written} buckets")
+    if since is not None:
+        print(f"Left buckets before {since.isoformat()} (archive cutoff) unchanged")
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    backfill = commands.add_parser("backfill", help="rebuild the counters from the quotes collection")
+    backfill.add_argument("--prune", action="store_true", help="delete buckets no longer backed by any quote")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "backfill":
+        asyncio.run(_backfill(args.prune))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import asyncio
+import contextvars
+import logging
+from typing import List, Optional, Tuple
+
+import pymongo
+from pymongo import WriteConcern
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteError
+
+from metrics import QUOTE_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+def write_concern(w: Optional[str], journal: Optional[bool] = None) -> Optional[WriteConcern]:
+    """Build a WriteConcern from env-style settings; None keeps the client default"""
+    if not w and journal is None:
+        return None
+    if w and w.isdigit():
+        w = int(w)
+    return WriteConcern(w=w or None, j=journal)
+
+
+def not_written(error: BaseException) -> bool:
+    """True if an insert that raised `error` certainly stored nothing.
+
+    Per-document write errors (e.g. a duplicate id) mean the document was
+    rejected. Anything else, such as a write concern error or a timeout,
+    leaves the outcome unknown: the document may well be stored.
+    """
+    return isinstance(error, WriteError)
+
+
+class QuoteWriter:
+    """Persists quote documents, optionally write-behind.
+
+    With `batching` off every call is a plain insert_one. With it on,
+    concurrent calls are collected and written with one unordered
+    insert_many once `batch_size` documents are waiting or `max_delay`
+    seconds have passed since the first one arrived, whichever comes first.
+    Each caller still awaits its own document: the future resolves only
+    after the batch is acknowledged, and a per-document write error (e.g. a
+    duplicate id) is raised to that caller alone. Write concern errors and
+    failures of the whole batch are raised to every caller as they are;
+    see `not_written`.
+
+    A batch is shared by many requests, so it must not inherit the Mongo
+    deadline (pymongo.timeout) of whichever request happened to start it:
+    the flush timer and task run in a fresh context, and insert_many gets
+    its own `timeout` in seconds.
+    """
+
+    def __init__(
+        self,
+        db,
+        collection: str = "quotes",
+        batching: bool = False,
+        batch_size: int = 100,
+        max_delay: float = 0.005,
+        write_concern: Optional[WriteConcern] = None,
+        timeout: float = 5.0,
+    ):
+        self.db = db
+        self.collection = db[collection]
+        if write_concern is not None:
+            self.collection = self.collection.with_options(write_concern=write_concern)
+        self.batching = batching
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self._pending: List[Tuple[dict, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: set = set()
+
+    async def insert(self, doc: dict) -> None:
+        if not self.batching:
+            await self.collection.insert_one(doc)
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((doc, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush_now()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.max_delay, self._flush_now, context=contextvars.Context(),
+            )
+        await future
+
+    def _flush_now(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._write(batch), context=contextvars.Context())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _write(self, batch: List[Tuple[dict, asyncio.Future]]) -> None:
+        QUOTE_BATCH_SIZE.observe(len(batch))
+        failed = {}
+        try:
+            with pymongo.timeout(self.timeout):
+                await self.collection.insert_many([doc for doc, _ in batch], ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                error_class = DuplicateKeyError if error.get("code") == 11000 else WriteError
+                failed[error["index"]] = error_class(error.get("errmsg", "write failed"), error.get("code"), error)
+            if e.details.get("writeConcernErrors"):
+                # Every document was written but durability is unconfirmed
+                for index in range(len(batch)):
+                    failed.setdefault(index, e)
+        except Exception as e:
+            logger.error(f"Quote batch of {len(batch)} failed: {e}")
+            failed = {index: e for index in range(len(batch))}
+        for index, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if index in failed:
+                future.set_exception(failed[index])
+            else:
+                future.set_result(None)
+
+    async def flush(self) -> None:
+        """Write everything pending and wait for in-flight batches"""
+        self._flush_now()
+        if self._flushes:
+            await asyncio.gather(*list(self._flushes), return_exceptions=True)
+
+    async def stop(self) -> None:
+        """Graceful shutdown: later calls insert directly, pending ones are flushed"""
+        self.batching = False
+        await self.flush()
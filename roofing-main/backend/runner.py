@@ -0,0 +1,199 @@
+"""Pre-forking production runner for server:app.
+
+Run from backend/:
+
+    python runner.py --workers 4 --port 8001
+
+The master imports the app once (preload), binds the listening socket and
+forks the workers, which share that socket and the preloaded code pages.
+Nothing in the app opens connections or threads at import time: each
+worker builds its own Motor client, Brevo pool and caches in its startup
+hooks, after the fork, so workers share nothing at runtime. That includes
+/api/metrics, which reports on the worker that answered.
+
+A worker exits gracefully after --max-requests (plus jitter, so workers do
+not all recycle at once) and the master starts a replacement. SIGTERM or
+SIGINT on the master is forwarded to every worker, which stops accepting,
+finishes in-flight requests within --graceful-timeout and runs the
+shutdown hooks. uvloop and httptools are used when installed.
+
+Every option can also be set from the environment (WEB_CONCURRENCY, HOST,
+PORT, MAX_REQUESTS, MAX_REQUESTS_JITTER, GRACEFUL_TIMEOUT).
+"""
+import argparse
+import importlib.util
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import time
+from typing import Dict
+
+import uvicorn
+
+logger = logging.getLogger("runner")
+
+# A worker that dies sooner than this is not respawned straight away
+MIN_WORKER_LIFETIME = 1.0
+
+
+def fast_path() -> Dict[str, str]:
+    """uvicorn loop/http implementations: the C ones when installed"""
+    return {
+        "loop": "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        "http": "httptools" if importlib.util.find_spec("httptools") else "h11",
+    }
+
+
+def bind(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Runner:
+    def __init__(self, app, args):
+        self.app = app
+        self.args = args
+        self.sock = bind(args.host, args.port, args.backlog)
+        self.workers: Dict[int, float] = {}
+        self.stopping = False
+
+    # ---------------------------------------------------------------- worker
+
+    def _worker(self) -> None:
+        # uvicorn installs its own SIGTERM/SIGINT handlers for graceful exit
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+            signal.signal(sig, signal.SIG_DFL)
+        max_requests = None
+        if self.args.max_requests:
+            max_requests = self.args.max_requests + random.randint(0, self.args.max_requests_jitter)
+        config = uvicorn.Config(
+            self.app,
+            limit_max_requests=max_requests,
+            timeout_graceful_shutdown=self.args.graceful_timeout,
+            timeout_keep_alive=self.args.keep_alive,
+            proxy_headers=True,
+            forwarded_allow_ips=self.args.forwarded_allow_ips,
+            access_log=self.args.access_log,
+            **fast_path(),
+        )
+        uvicorn.Server(config).run(sockets=[self.sock])
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                self._worker()
+            except BaseException:
+                logger.exception("Worker crashed")
+                status = 1
+            finally:
+                os._exit(status)
+        self.workers[pid] = time.monotonic()
+        logger.info(f"Started worker {pid}")
+
+    # ---------------------------------------------------------------- master
+
+    def _terminate(self, signum, frame) -> None:
+        if self.stopping:
+            return
+        self.stopping = True
+        logger.info(f"Received {signal.Signals(signum).name}, draining {len(self.workers)} workers")
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _reap(self, block: bool) -> None:
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, 0 if block else os.WNOHANG)
+            except ChildProcessError:
+                self.workers.clear()
+                return
+            if pid == 0:
+                return
+            started = self.workers.pop(pid, None)
+            if started is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if self.stopping:
+                logger.info(f"Worker {pid} stopped ({code})")
+                if block:
+                    return
+                continue
+            lifetime = time.monotonic() - started
+            logger.info(f"Worker {pid} exited ({code}) after {lifetime:.1f}s, replacing it")
+            if lifetime < MIN_WORKER_LIFETIME:
+                time.sleep(MIN_WORKER_LIFETIME)
+            self.spawn()
+            if block:
+                return
+
+    def run(self) -> None:
+        paths = fast_path()
+        logger.info(
+            f"Listening on {self.args.host}:{self.args.port} with {self.args.workers} workers "
+            f"(loop={paths['loop']}, http={paths['http']})"
+        )
+        signal.signal(signal.SIGTERM, self._terminate)
+        signal.signal(signal.SIGINT, self._terminate)
+        for _ in range(self.args.workers):
+            self.spawn()
+
+        while self.workers and not self.stopping:
+            self._reap(block=True)
+
+        deadline = time.monotonic() + self.args.graceful_timeout + 5
+        while self.workers and time.monotonic() < deadline:
+            self._reap(block=False)
+            time.sleep(0.1)
+        for pid in list(self.workers):
+            logger.warning(f"Worker {pid} did not stop in time, killing it")
+            os.kill(pid, signal.SIGKILL)
+        self._reap(block=True)
+        self.sock.close()
+
+
+def parse_args(argv=None):
+    env = os.environ.get
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=int(env("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--host", default=env("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(env("PORT", "8001")))
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--max-requests", type=int, default=int(env("MAX_REQUESTS", "0")),
+                        help="recycle a worker after this many requests; 0 disables")
+    parser.add_argument("--max-requests-jitter", type=int, default=int(env("MAX_REQUESTS_JITTER", "0")))
+    parser.add_argument("--graceful-timeout", type=int, default=int(env("GRACEFUL_TIMEOUT", "30")),
+                        help="seconds a stopping worker may spend finishing requests")
+    parser.add_argument("--keep-alive", type=int, default=5)
+    parser.add_argument("--forwarded-allow-ips", default=env("FORWARDED_ALLOW_IPS", "127.0.0.1"))
+    parser.add_argument("--access-log", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    # Preload: import once in the master so workers inherit the loaded code
+    import server
+
+    if server.client is not None:
+        raise RuntimeError("The Mongo client must not exist before workers fork")
+    Runner(server.app, args).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Response
-from fastapi.middleware.gzip import GZipMiddleware
+import time
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -10,53 +13,71 @@ from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
 from typing import List, Optional
 import uuid
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from functools import lru_cache
 import os
-import sib_api_v3_sdk
-from sib_api_v3_sdk.rest import ApiException
+from admission import AdmissionLimit, AdmissionMiddleware, detached
+from catalog_cache import etag_matches
+from catalog_store import CatalogSection, CatalogStore
+from compression import CompressionMiddleware
+from static_assets import StaticAssets
+import image_variants
+from image_variants import MEDIA_TYPES, HTTPFetcher, ImagePipeline, LocalFetcher
+from brevo_client import BrevoClient
+from email_outbox import EmailOutbox, PENDING
+import quote_queries
+import quote_search
+import quote_export
+import quote_ingest
+from db_indexes import setup_indexes
+from email_templates import render_quote_emails
+from quote_dedupe import IdempotencyKeyReused, QuoteDeduplicator
+from quote_writer import QuoteWriter, not_written, write_concern
+from quote_stats import QuoteStats
+from quote_retention import ArchiveCorrupt, QuoteArchiver, archiver_from_env
+from json_response import FastJSONResponse
+from metrics import REGISTRY, LoopLagMonitor, MetricsMiddleware, mongo_listeners
+from startup import StartupTimer
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url, maxPoolSize=50, minPoolSize=10)
-db = client[os.environ['DB_NAME']]
+startup_timer = StartupTimer(_import_started)
 
+# STARTUP_MODE=lazy serves the first request as soon as Mongo is connected;
+# index setup, catalog warm-up and the Brevo SDK load finish in the background
+STARTUP_MODE = os.environ.get("STARTUP_MODE", "eager")
 
-def send_email_brevo(to_email: str, subject: str, html_content: str):
-    """Send email using Brevo (Sendinblue) API"""
-    configuration = sib_api_v3_sdk.Configuration()
-    configuration.api_key['api-key'] = os.environ.get("BREVO_API_KEY")
+# MongoDB connection, created by the connect_mongo startup hook. Everything
+# that talks to Mongo is built by init_db() once the database is known.
+client: Optional[AsyncIOMotorClient] = None
+db = None
+email_outbox: Optional[EmailOutbox] = None
+quote_deduplicator: Optional[QuoteDeduplicator] = None
+quote_writer: Optional[QuoteWriter] = None
+quote_stats: Optional[QuoteStats] = None
+catalog_store: Optional[CatalogStore] = None
+quote_archiver: Optional[QuoteArchiver] = None
 
-    api_instance = sib_api_v3_sdk.TransactionalEmailsApi(
-        sib_api_v3_sdk.ApiClient(configuration)
-    )
 
-    send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
-        to=[{"email": to_email}],
-        sender={
-            "email": os.environ.get("SENDER_EMAIL"),
-            "name": "22G Roofing"
-        },
-        subject=subject,
-        html_content=html_content,
+# Shared Brevo client (connection pool + keep-alive); the SDK is imported on start
+brevo_client = (
+    BrevoClient(
+        api_key=os.environ["BREVO_API_KEY"],
+        sender_email=os.environ.get("SENDER_EMAIL"),
+        host=os.environ.get("BREVO_API_URL"),
+        pool_size=int(os.environ.get("BREVO_POOL_SIZE", "10")),
+        timeout=float(os.environ.get("BREVO_TIMEOUT", "10")),
     )
-
-    try:
-        api_instance.send_transac_email(send_smtp_email)
-        logger.info(f"Email sent successfully to {to_email}")
-        return True
-    except ApiException as e:
-        logger.error(f"Brevo email error: {e}")
-        return False
+    if os.environ.get("BREVO_API_KEY")
+    else None
+)
 
 # Create the main app
-app = FastAPI(title="22G Roofing API")
+app = FastAPI(title="22G Roofing API", default_response_class=FastJSONResponse)
 
-# Add GZip compression for faster responses
-app.add_middleware(GZipMiddleware, minimum_size=500)
+# Negotiated br/gzip for dynamic responses; catalog bodies arrive precompressed
+app.add_middleware(CompressionMiddleware, minimum_size=500)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -104,11 +125,6 @@ class ContactInfo(BaseModel):
     contacts: List[dict]
     email: str
 
-# Cache for static data
-_contact_info_cache = None
-_services_cache = None
-_projects_cache = None
-
 def get_contact_info_data():
     return ContactInfo(
         company_name="22G Roofing Pty Ltd",
@@ -230,158 +246,469 @@ def get_projects_data():
         ),
     ]
 
+# Resized WebP/AVIF/JPEG variants of catalog images, cached on disk.
+# IMAGE_SOURCE_DIR serves sources from local files instead of fetching them.
+# IMAGE_CACHE_MAX_MB is per worker process: N workers may fill N times that.
+image_source_dir = os.environ.get("IMAGE_SOURCE_DIR")
+image_pipeline = (
+    ImagePipeline(
+        Path(os.environ.get("IMAGE_CACHE_DIR", ROOT_DIR / "image_cache")),
+        max_bytes=int(os.environ.get("IMAGE_CACHE_MAX_MB", "512")) * 1024 * 1024,
+        fetcher=LocalFetcher(Path(image_source_dir)) if image_source_dir else HTTPFetcher(),
+        workers=int(os.environ.get("IMAGE_WORKERS", "2")),
+    )
+    if image_variants.ENABLED and os.environ.get("IMAGE_VARIANTS", "1") != "0"
+    else None
+)
+
+def init_db(database) -> None:
+    """Bind every Mongo-backed component to `database`"""
+    global db, email_outbox, quote_deduplicator, quote_writer, quote_stats, catalog_store, quote_archiver
+    db = database
+
+    # Persistent email outbox, drained by background workers
+    email_outbox = (
+        EmailOutbox(
+            db,
+            brevo_client,
+            workers=int(os.environ.get("EMAIL_OUTBOX_WORKERS", "2")),
+            max_attempts=int(os.environ.get("EMAIL_OUTBOX_MAX_ATTEMPTS", "5")),
+            compose=quote_notifications,
+        )
+        if brevo_client is not None
+        else None
+    )
+
+    # Duplicate-submission suppression for POST /api/quote
+    quote_deduplicator = QuoteDeduplicator(
+        db,
+        fingerprint_window=float(os.environ.get("QUOTE_DEDUPE_WINDOW", "600")),
+        lru_size=int(os.environ.get("QUOTE_DEDUPE_LRU_SIZE", "10000")),
+        settle_seconds=float(os.environ.get("QUOTE_DEDUPE_SETTLE", "60")),
+    )
+
+    # Quote inserts; QUOTE_WRITE_BEHIND=1 groups bursts into insert_many batches
+    quote_writer = QuoteWriter(
+        db,
+        batching=os.environ.get("QUOTE_WRITE_BEHIND", "0") == "1",
+        batch_size=int(os.environ.get("QUOTE_BATCH_SIZE", "100")),
+        max_delay=float(os.environ.get("QUOTE_BATCH_DELAY_MS", "5")) / 1000,
+        timeout=float(os.environ.get("QUOTE_BATCH_TIMEOUT_MS", "5000")) / 1000,
+        write_concern=write_concern(
+            os.environ.get("QUOTE_WRITE_CONCERN"),
+            {"1": True, "0": False}.get(os.environ.get("QUOTE_WRITE_JOURNAL", "")),
+        ),
+    )
+
+    # Per-day / per-week counters behind /api/quotes/stats
+    quote_stats = QuoteStats(db, tz=os.environ.get("STATS_TIMEZONE", "Australia/Sydney"))
+
+    # Archival of old quotes (RETENTION_ARCHIVE_MONTHS); pauses while quote
+    # requests are queueing for admission
+    quote_archiver = archiver_from_env(db, busy=lambda: quote_limit.waiting > 0 or quotes_read_limit.waiting > 0)
+
+    # Catalog lives in Mongo (seeded from the defaults above) and is served from
+    # an in-process cache that revalidates against a version counter
+    catalog_store = CatalogStore(
+        db,
+        [
+            CatalogSection("contact_info", "contact_info", get_contact_info_data, max_age=3600, single=True, model=ContactInfo),
+            CatalogSection("services", "services", get_services_data, max_age=3600),
+            CatalogSection("projects", "projects", get_projects_data, max_age=1800, model=Project),
+        ],
+        ttl=float(os.environ.get("CATALOG_TTL", "30")),
+        watch=os.environ.get("CATALOG_CHANGE_STREAM", "1") != "0",
+        decorate=image_pipeline.decorate if image_pipeline is not None else None,
+    )
+
+
+def connect_mongo() -> None:
+    global client
+    client = AsyncIOMotorClient(
+        os.environ["MONGO_URL"],
+        maxPoolSize=int(os.environ.get("MONGO_MAX_POOL_SIZE", "50")),
+        minPoolSize=int(os.environ.get("MONGO_MIN_POOL_SIZE", "10")),
+        event_listeners=mongo_listeners(),
+    )
+    init_db(client[os.environ["DB_NAME"]])
+
+
+async def warm_mongo_pool(connections: int) -> None:
+    """Open `connections` pooled connections now instead of on first use"""
+    await asyncio.gather(*(db.command("ping") for _ in range(connections)))
+
 # Routes
 @api_router.get("/")
 async def root():
     return {"message": "22G Roofing API", "status": "active"}
 
 @api_router.get("/contact-info", response_model=ContactInfo)
-async def get_contact_info(response: Response):
-    response.headers["Cache-Control"] = "public, max-age=3600"
-    return get_contact_info_data()
+async def get_contact_info(request: Request):
+    return await catalog_store.respond("contact_info", request)
 
 @api_router.get("/projects", response_model=List[Project])
-async def get_projects(response: Response):
-    response.headers["Cache-Control"] = "public, max-age=1800"
-    return get_projects_data()
+async def get_projects(request: Request):
+    return await catalog_store.respond("projects", request)
 
 @api_router.get("/services")
-async def get_services(response: Response):
-    response.headers["Cache-Control"] = "public, max-age=3600"
-    return get_services_data()
+async def get_services(request: Request):
+    return await catalog_store.respond("services", request)
+
+@api_router.get("/images/{key}/{width}.{fmt}")
+async def get_image(key: str, width: int, fmt: str, request: Request):
+    """One resized variant of a catalog image; URLs come from the catalog's srcset"""
+    if image_pipeline is None:
+        raise HTTPException(status_code=404, detail="Image variants are disabled")
+    etag = f'"{key}-{width}-{fmt}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    try:
+        data = await image_pipeline.variant(key, width, fmt)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown image variant")
+    except Exception as e:
+        logger.error(f"Image variant {key}/{width}.{fmt} failed: {e}")
+        raise HTTPException(status_code=502, detail="Source image unavailable")
+    return Response(content=data, media_type=MEDIA_TYPES[fmt], headers=headers)
+
+def quote_notifications(quote: dict) -> List[dict]:
+    """Outbox messages for a new quote: the admin notice and the customer confirmation"""
+    bodies = render_quote_emails(quote)
+    messages = []
+    notification_email = os.environ.get("NOTIFICATION_EMAIL")
+    if notification_email:
+        messages.append(email_outbox.message(
+            quote["id"], "admin", notification_email,
+            f"New Quote Request - {quote['service_type']}", bodies["admin"],
+        ))
+    messages.append(email_outbox.message(
+        quote["id"], "customer", quote["email"],
+        "Quote Request Confirmation - 22G Roofing", bodies["customer"],
+    ))
+    return messages
+
+def quote_response(doc: dict, replayed: bool = False) -> FastJSONResponse:
+    headers = {"Idempotent-Replayed": "true"} if replayed else None
+    return FastJSONResponse(quote_ingest.public(doc), headers=headers)
 
 @api_router.post("/quote", response_model=QuoteRequest)
-async def submit_quote(input: QuoteRequestCreate):
-    quote_obj = QuoteRequest(**input.dict())
-    quote_dict = quote_obj.dict()
-    quote_dict['created_at'] = quote_obj.created_at.isoformat()
-    
-    # Store in MongoDB
-    await db.quotes.insert_one(quote_dict)
-    logger.info(f"Quote request saved: {quote_obj.id}")
-    
-    # ================== EMAIL TEMPLATES ==================
-    email_html = f"""
-    <html>
-    <body style="font-family: Arial, sans-serif; padding: 20px; background-color: #f8fafc;">
-        <div style="max-width: 600px; margin: 0 auto; background: white; padding: 30px; border: 1px solid #e2e8f0; border-radius: 8px;">
-            <h1 style="color: #0f172a; margin-bottom: 20px;">New Quote Request</h1>
-            <table style="width: 100%; border-collapse: collapse;">
-                <tr style="border-bottom: 1px solid #e2e8f0;">
-                    <td style="padding: 10px 0; color: #64748b; font-weight: bold;">Name:</td>
-                    <td style="padding: 10px 0; color: #0f172a;">{quote_obj.name}</td>
-                </tr>
-                <tr style="border-bottom: 1px solid #e2e8f0;">
-                    <td style="padding: 10px 0; color: #64748b; font-weight: bold;">Email:</td>
-                    <td style="padding: 10px 0; color: #0f172a;">{quote_obj.email}</td>
-                </tr>
-                <tr style="border-bottom: 1px solid #e2e8f0;">
-                    <td style="padding: 10px 0; color: #64748b; font-weight: bold;">Phone:</td>
-                    <td style="padding: 10px 0; color: #0f172a;">{quote_obj.phone}</td>
-                </tr>
-                <tr style="border-bottom: 1px solid #e2e8f0;">
-                    <td style="padding: 10px 0; color: #64748b; font-weight: bold;">Service Type:</td>
-                    <td style="padding: 10px 0; color: #0f172a;">{quote_obj.service_type}</td>
-                </tr>
-                <tr>
-                    <td style="padding: 10px 0; color: #64748b; font-weight: bold;">Address:</td>
-                    <td style="padding: 10px 0; color: #0f172a;">{quote_obj.address or 'N/A'}</td>
-                </tr>
-            </table>
-            <p style="margin-top: 20px; color: #64748b; white-space: pre-wrap; word-wrap: break-word;">
-                <strong>Message:</strong><br>{quote_obj.message or 'No additional message'}
-            </p>
-        </div>
-    </body>
-    </html>
-    """
-    
-    customer_email_html = f"""
-    <html>
-    <body style="font-family: Arial, sans-serif; padding: 20px; background-color: #f8fafc;">
-        <div style="max-width: 600px; margin: 0 auto; background: white; padding: 30px; border: 1px solid #e2e8f0; border-radius: 8px;">
-            <h1 style="color: #0f172a; margin-bottom: 20px; font-size: 24px;">✓ Quote Request Received</h1>
-            <p style="color: #0f172a; font-size: 16px; line-height: 1.6;">
-                Hi <strong>{quote_obj.name}</strong>,<br><br>
-                Thank you for choosing <strong>22G Roofing</strong>! We've successfully received your quote request for <strong>{quote_obj.service_type}</strong>.<br><br>
-                Our team will review your request and get back to you shortly at <strong>{quote_obj.phone}</strong> or <strong>{quote_obj.email}</strong>.
-            </p>
-            
-            <div style="background-color: #f1f5f9; padding: 20px; border-left: 4px solid #0ea5e9; margin: 20px 0; border-radius: 4px;">
-                <h3 style="color: #0f172a; margin-top: 0;">Your Quote Details:</h3>
-                <table style="width: 100%;">
-                    <tr>
-                        <td style="color: #64748b; font-weight: bold;">Request ID:</td>
-                        <td style="color: #0f172a;"><code style="background: white; padding: 4px 8px; border-radius: 4px;">{quote_obj.id}</code></td>
-                    </tr>
-                    <tr>
-                        <td style="color: #64748b; font-weight: bold; padding-top: 8px;">Service Type:</td>
-                        <td style="color: #0f172a; padding-top: 8px;">{quote_obj.service_type}</td>
-                    </tr>
-                </table>
-            </div>
-            
-            <p style="color: #64748b; font-size: 14px;">
-                <strong>Contact Us:</strong><br>
-                📞 Pavandeep Singh: +61 448 046 461<br>
-                📞 Bhupendra Singh: +61 410 632 540<br>
-                📧 Email: sales22groofing@outlook.com<br>
-                📍 Address: 12 Bedford Road, Blacktown NSW 2148, Australia
-            </p>
-            
-            <p style="margin-top: 30px; color: #64748b; font-size: 12px; border-top: 1px solid #e2e8f0; padding-top: 20px;">
-                This is an automated response. Please do not reply to this email.
-            </p>
-        </div>
-    </body>
-    </html>
-    """
-    
-    # ================== SEND NOTIFICATIONS VIA BREVO ==================
-    if os.environ.get("BREVO_API_KEY"):
-        try:
-            # Email to admin with quote details
-            admin_sent = send_email_brevo(
-                to_email=os.environ.get("NOTIFICATION_EMAIL"),
-                subject=f"New Quote Request - {quote_obj.service_type}",
-                html_content=email_html
-            )
-
-            # Email to customer with confirmation
-            customer_sent = send_email_brevo(
-                to_email=quote_obj.email,
-                subject="Quote Request Confirmation - 22G Roofing",
-                html_content=customer_email_html
-            )
-
-            if admin_sent and customer_sent:
-                logger.info(f"All emails sent successfully for quote {quote_obj.id}")
-            else:
-                logger.warning(f"Some emails failed to send for quote {quote_obj.id}")
+async def submit_quote(
+    input: QuoteRequestCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+):
+    # The body was validated once by FastAPI; this dump becomes the document
+    quote = input.model_dump()
+    claim_keys = quote_deduplicator.claim_keys(quote, idempotency_key)
+    try:
+        cached = quote_deduplicator.cached(claim_keys, quote)
+        if cached is not None:
+            return quote_response(cached, replayed=True)
 
-        except Exception as e:
-            logger.error(f"Brevo email service error: {e}")
+        quote_ingest.build_quote(quote)
+        quote_id = quote["id"]
+        existing_id = await quote_deduplicator.claim(claim_keys, quote_id, quote)
+    except IdempotencyKeyReused:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different quote request")
+    if existing_id is not None:
+        original = await quote_deduplicator.original(existing_id)
+        if original is None:
+            raise HTTPException(status_code=409, detail="A matching quote request is still being processed")
+        quote_deduplicator.remember(claim_keys, original)
+        logger.info(f"Duplicate quote submission suppressed: {existing_id}")
+        return quote_response(original, replayed=True)
+
+    # ================== QUEUE NOTIFICATIONS ==================
+    messages = []
+    if email_outbox is not None:
+        messages = quote_notifications(quote)
+        quote['notifications'] = {m["kind"]: PENDING for m in messages}
     else:
         logger.warning("BREVO_API_KEY not configured - emails not sent")
-    
-    return quote_obj
+
+    # Store in MongoDB, then hand the emails to the outbox workers. If the
+    # enqueue never happens, the outbox sweeper finds the pending
+    # notifications and queues them.
+    try:
+        await quote_writer.insert(quote)
+    except Exception as e:
+        # Cleanup still runs when the request's Mongo budget is spent
+        if not_written(e):
+            await detached(quote_deduplicator.release(claim_keys, quote_id))
+        else:
+            # The quote may be stored anyway; don't let a retry insert it twice
+            quote_deduplicator.settle(claim_keys, quote_id)
+        raise
+    quote.pop('_id', None)
+    logger.info(f"Quote request saved: {quote_id}")
+    if messages:
+        await email_outbox.enqueue(messages)
+    # Only replay from memory once the emails are queued
+    quote_deduplicator.remember(claim_keys, quote)
+    await quote_stats.record(quote["service_type"], quote["created_at"])
+
+    return quote_response(quote)
 
 @api_router.get("/quotes", response_model=List[QuoteRequest])
-async def get_quotes():
-    quotes = await db.quotes.find({}, {"_id": 0}).to_list(1000)
-    return quotes
+async def get_quotes(
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    service_type: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    batch_size: int = Query(500, ge=1, le=10000),
+):
+    """Newest-first quotes, keyset-paginated on (created_at, id).
+
+    The next page's cursor is returned in the X-Next-Cursor header. With
+    format=ndjson every matching quote is streamed from the Motor cursor.
+    """
+    query = quote_queries.build_filter(service_type, created_from, created_to, after)
+    projection = quote_queries.projection(fields)
+
+    if format == "ndjson":
+        return StreamingResponse(
+            quote_queries.stream_ndjson(db.quotes, query, projection, batch_size),
+            media_type="application/x-ndjson",
+        )
+
+    quotes, next_cursor = await quote_queries.fetch_page(db.quotes, query, projection, limit)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    return Response(
+        content=quote_queries.dumps(quotes),
+        media_type="application/json",
+        headers=headers,
+    )
+
+@api_router.get("/quotes/export")
+async def export_quotes(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    after_created_at: Optional[str] = None,
+    after_id: Optional[str] = None,
+    batch_size: int = Query(2000, ge=100, le=10000),
+):
+    """Stream every matching quote, oldest first, as a file download.
+
+    To resume an interrupted download, pass the created_at and id of the
+    last row received as after_created_at / after_id.
+    """
+    after = None
+    if after_created_at or after_id:
+        if not (after_created_at and after_id):
+            raise HTTPException(status_code=400, detail="after_created_at and after_id go together")
+        try:
+            datetime.fromisoformat(after_created_at)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="after_created_at must be an ISO timestamp")
+        after = (after_created_at, after_id)
+    query = quote_export.build_filter(created_from, created_to, after)
+    name = quote_export.filename(format, gzip)
+    return StreamingResponse(
+        quote_export.stream(db.quotes, format, query, gzip, batch_size),
+        media_type="application/gzip" if gzip else quote_export.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{name}"'},
+    )
+
+@api_router.get("/quotes/search", response_model=List[QuoteRequest])
+async def search_quotes(
+    q: str = Query(..., min_length=1, max_length=200),
+    prefix: bool = False,
+    limit: int = Query(20, ge=1, le=100),
+    after: Optional[str] = None,
+    service_type: Optional[str] = None,
+):
+    """Find quotes by name, phone, email, address or message words.
+
+    Phone numbers and emails match exactly on their normalized form; words
+    are ranked by text score. prefix=true does type-ahead matching on the
+    last word (or the phone/email typed so far) instead.
+    """
+    quotes, next_cursor = await quote_search.search(db.quotes, q, prefix, limit, after, service_type)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    return Response(
+        content=quote_queries.dumps(quotes),
+        media_type="application/json",
+        headers=headers,
+    )
+
+@api_router.get("/quotes/stats")
+async def get_quote_stats(
+    period: str = Query("day", pattern="^(day|week)$"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    service_type: Optional[str] = None,
+):
+    """Quote counts per service_type per day or week (Monday start)"""
+    buckets = await quote_stats.query(period, start, end, service_type)
+    return {"period": period, "timezone": quote_stats.tz_name, "buckets": buckets}
+
+@api_router.post("/quotes/rehydrate")
+async def rehydrate_quotes(
+    start: date = Query(..., alias="from"),
+    end: date = Query(..., alias="to"),
+):
+    """Restore archived quotes created on the UTC days from..to, for a limited time"""
+    if end < start:
+        raise HTTPException(status_code=400, detail="'to' is before 'from'")
+    if (end - start).days > 366:
+        raise HTTPException(status_code=400, detail="Rehydrate at most a year at a time")
+    if quote_archiver.root is None:
+        raise HTTPException(status_code=404, detail="No quote archive is configured (RETENTION_ARCHIVE_DIR)")
+    try:
+        return await quote_archiver.rehydrate(start, end)
+    except ArchiveCorrupt as e:
+        logger.error(f"Rehydrate {start}..{end} failed: {e}")
+        raise HTTPException(status_code=500, detail="Archive failed verification")
+
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(REGISTRY.expose(), media_type="text/plain; version=0.0.4")
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# Serve the React production build, when present, for everything outside /api
+frontend_build = Path(os.environ.get("FRONTEND_BUILD_DIR", ROOT_DIR.parent / "frontend" / "build"))
+static_assets = None
+if (frontend_build / "index.html").exists():
+    static_assets = StaticAssets(
+        frontend_build,
+        serve_source_maps=os.environ.get("SERVE_SOURCE_MAPS") == "1",
+    )
+    app.mount("/", static_assets, name="frontend")
+
+def _budget(name: str, default_ms: str) -> float:
+    return float(os.environ.get(name, default_ms)) / 1000
+
+# Admission control for the Mongo-bound routes. Catalog GETs are served from
+# memory and stay unlimited; the limits below add up to less than the Motor
+# pool so limited requests never queue inside the driver. GET /api/quotes
+# has no budget because format=ndjson streams for as long as it takes, as
+# does the export.
+quote_limit = AdmissionLimit(
+    "quote",
+    concurrency=int(os.environ.get("QUOTE_CONCURRENCY", "20")),
+    queue=int(os.environ.get("QUOTE_QUEUE", "50")),
+)
+quotes_read_limit = AdmissionLimit(
+    "quotes_read",
+    concurrency=int(os.environ.get("QUOTES_READ_CONCURRENCY", "10")),
+    queue=int(os.environ.get("QUOTES_READ_QUEUE", "20")),
+)
+export_limit = AdmissionLimit(
+    "quotes_export",
+    concurrency=int(os.environ.get("QUOTES_EXPORT_CONCURRENCY", "2")),
+    queue=int(os.environ.get("QUOTES_EXPORT_QUEUE", "0")),
+)
+if os.environ.get("ADMISSION_CONTROL", "1") != "0":
+    read_budget = _budget("QUOTES_READ_BUDGET_MS", "5000")
+    app.add_middleware(AdmissionMiddleware, routes={
+        ("POST", "/api/quote"): (quote_limit, _budget("QUOTE_BUDGET_MS", "3000")),
+        ("GET", "/api/quotes"): (quotes_read_limit, None),
+        ("GET", "/api/quotes/search"): (quotes_read_limit, read_budget),
+        ("GET", "/api/quotes/stats"): (quotes_read_limit, read_budget),
+        ("GET", "/api/quotes/export"): (export_limit, None),
+        ("POST", "/api/quotes/rehydrate"): (export_limit, None),
+    })
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Idempotent-Replayed", "Retry-After"],
 )
 
+# Outermost, so recorded latency covers CORS and compression too
+app.add_middleware(MetricsMiddleware)
+
+loop_lag_monitor = LoopLagMonitor()
+
+startup_timer.record("import", time.perf_counter() - _import_started)
+
+async def _run_startup_phase(name: str, work) -> None:
+    """Await `work` now, or hand it to the background in lazy startup mode"""
+    if STARTUP_MODE == "lazy":
+        startup_timer.background(name, work)
+    else:
+        with startup_timer.phase(name):
+            await work
+
+@app.on_event("startup")
+async def connect_database():
+    # The benchmark harness binds an in-memory database before startup
+    if db is None:
+        with startup_timer.phase("mongo_client"):
+            connect_mongo()
+    warmup = int(os.environ.get("MONGO_WARMUP_CONNECTIONS", "0"))
+    if warmup:
+        startup_timer.background("mongo_warmup", warm_mongo_pool(warmup))
+
+@app.on_event("startup")
+async def start_loop_lag_monitor():
+    loop_lag_monitor.start()
+
+@app.on_event("startup")
+async def load_static_assets():
+    if static_assets is not None:
+        with startup_timer.phase("static_assets"):
+            await asyncio.to_thread(static_assets.load)
+
+@app.on_event("startup")
+async def create_indexes():
+    async def work():
+        try:
+            await setup_indexes(db)
+            await quote_archiver.ensure_ttl_index()
+        except Exception as e:
+            logger.error(f"Index setup failed: {e}")
+
+    await _run_startup_phase("indexes", work())
+
+@app.on_event("startup")
+async def load_catalog():
+    async def work():
+        try:
+            await catalog_store.seed_defaults()
+            await catalog_store.warm()
+        except Exception as e:
+            # Requests will retry the load; the service stays up meanwhile
+            logger.error(f"Catalog load failed: {e}")
+
+    await _run_startup_phase("catalog", work())
+    catalog_store.start_watching()
+
+@app.on_event("startup")
+async def start_email_outbox():
+    if brevo_client is not None:
+        await _run_startup_phase("brevo_sdk", asyncio.to_thread(brevo_client.start))
+    if email_outbox is not None:
+        email_outbox.start()
+
+@app.on_event("startup")
+async def start_retention():
+    quote_archiver.start()
+
+@app.on_event("startup")
+async def report_startup():
+    startup_timer.ready()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    await startup_timer.stop()
+    await quote_writer.stop()
+    if email_outbox is not None:
+        await email_outbox.stop()
+    if brevo_client is not None:
+        brevo_client.close()
+    await catalog_store.stop()
+    await quote_archiver.stop()
+    await loop_lag_monitor.stop()
+    if client is not None:
+        client.close()
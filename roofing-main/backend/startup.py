@@ -0,0 +1,57 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Dict
+
+from metrics import STARTUP_PHASES
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """Times the app's import and startup phases.
+
+    Each phase is logged and exported as app_startup_phase_seconds{phase}.
+    `ready` is measured from `started` (taken before the app's first import)
+    to the end of the startup hooks, i.e. when the first request can be
+    served. Work handed to `background()` runs after that and is timed too.
+    """
+
+    def __init__(self, started: float):
+        self.started = started
+        self.phases: Dict[str, float] = {}
+        self._tasks: set = set()
+
+    def record(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = seconds
+        STARTUP_PHASES.set(phase, value=seconds)
+        logger.info(f"Startup phase {phase}: {seconds * 1000:.1f} ms")
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def ready(self) -> None:
+        self.record("ready", time.perf_counter() - self.started)
+
+    async def _timed(self, name: str, work: Awaitable) -> None:
+        with self.phase(name):
+            try:
+                await work
+            except Exception as e:
+                logger.error(f"Background startup phase {name} failed: {e}")
+
+    def background(self, name: str, work: Awaitable) -> None:
+        task = asyncio.create_task(self._timed(name, work))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def stop(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,230 @@
+import hashlib
+import json
+import logging
+import mimetypes
+import mmap
+import os
+import re
+import uuid
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from catalog_cache import etag_matches, variant_etag
+from compression import COMPRESSIBLE_TYPES, ENCODINGS, MINIMUM_SIZE, compress, negotiate
+
+logger = logging.getLogger(__name__)
+
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+# Files at or below this size are kept in memory; larger ones are mmapped
+MEMORY_LIMIT = 64 * 1024
+CHUNK_SIZE = 256 * 1024
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# CRA output names fingerprinted files like main.e16f8a4a.js
+_FINGERPRINT = re.compile(r"\.[0-9a-f]{8,}\.")
+
+
+class Asset:
+    """One servable file with its metadata computed once at startup"""
+
+    def __init__(self, path: Path, url: str, immutable: bool):
+        stat = path.stat()
+        self.path = path
+        self.url = url
+        self.size = stat.st_size
+        self.mtime = int(stat.st_mtime)
+        content_type, _ = mimetypes.guess_type(path.name)
+        self.content_type = content_type or "application/octet-stream"
+        if self.content_type.startswith("text/") or self.content_type in ("application/javascript", "application/json"):
+            self.content_type += "; charset=utf-8"
+        self.cache_control = IMMUTABLE if immutable else REVALIDATE
+        self.last_modified = formatdate(self.mtime, usegmt=True)
+        data = path.read_bytes()
+        self.etag = '"' + hashlib.sha256(data).hexdigest()[:32] + '"'
+        self.data = data if self.size <= MEMORY_LIMIT else None
+        # encoding -> (sibling path, size, in-memory bytes or None)
+        self.variants: Dict[str, tuple] = {}
+
+    @property
+    def compressible(self) -> bool:
+        return self.content_type.split(";")[0] in COMPRESSIBLE_TYPES and self.size >= MINIMUM_SIZE
+
+    def add_variant(self, encoding: str, sibling: Path) -> None:
+        size = sibling.stat().st_size
+        if size >= self.size:
+            return
+        data = sibling.read_bytes() if size <= MEMORY_LIMIT else None
+        self.variants[encoding] = (sibling, size, data)
+
+
+def _write_atomic(path: Path, data: bytes, mtime: int) -> None:
+    """Replace `path` with `data` in one rename.
+
+    Every worker precompresses at startup, so a sibling may be written by
+    several at once; each writes its own temporary file and readers only
+    ever see a complete one.
+    """
+    tmp = path.with_name(f"{path.name}.{os.getpid()}-{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        tmp.write_bytes(data)
+        os.utime(tmp, (mtime, mtime))
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+class StaticAssets:
+    """ASGI app serving the React production build.
+
+    On `load()` it reads asset-manifest.json, writes .br/.gz siblings next to
+    every compressible file (skipping ones that are already up to date) and
+    computes ETag / Last-Modified once. Fingerprinted files get a one-year
+    immutable Cache-Control; everything else must revalidate. Unknown paths
+    without a file extension fall back to index.html for client-side
+    routing. Source maps are only served when `serve_source_maps` is set.
+    """
+
+    def __init__(self, directory: Path, serve_source_maps: bool = False, api_prefix: str = "/api"):
+        self.directory = Path(directory)
+        self.serve_source_maps = serve_source_maps
+        self.api_prefix = api_prefix
+        self.assets: Dict[str, Asset] = {}
+        self.index: Optional[Asset] = None
+
+    def _manifest_urls(self) -> set:
+        manifest = self.directory / "asset-manifest.json"
+        if not manifest.exists():
+            return set()
+        data = json.loads(manifest.read_text())
+        urls = set(data.get("files", {}).values())
+        urls.update("/" + entry.lstrip("/") for entry in data.get("entrypoints", []))
+        return urls
+
+    def _precompress(self, asset: Asset) -> None:
+        source = None
+        for encoding in ENCODINGS:
+            sibling = asset.path.with_name(asset.path.name + SUFFIXES[encoding])
+            if not sibling.exists() or sibling.stat().st_mtime < asset.mtime:
+                if source is None:
+                    source = asset.path.read_bytes()
+                _write_atomic(sibling, compress(source, encoding, static=True), asset.mtime)
+            asset.add_variant(encoding, sibling)
+
+    def load(self) -> None:
+        manifest_urls = self._manifest_urls()
+        assets = {}
+        for path in sorted(self.directory.rglob("*")):
+            if not path.is_file() or path.suffix in (".br", ".gz", ".tmp"):
+                continue
+            if path.suffix == ".map" and not self.serve_source_maps:
+                continue
+            url = "/" + path.relative_to(self.directory).as_posix()
+            immutable = url.startswith("/static/") and (
+                url in manifest_urls or bool(_FINGERPRINT.search(path.name))
+            )
+            asset = Asset(path, url, immutable)
+            if asset.compressible:
+                self._precompress(asset)
+            assets[url] = asset
+        self.assets = assets
+        self.index = assets.get("/index.html")
+        logger.info(f"Loaded {len(assets)} static assets from {self.directory}")
+
+    def _resolve(self, path: str) -> Optional[Asset]:
+        if path == "/":
+            return self.index
+        asset = self.assets.get(path)
+        if asset is not None:
+            return asset
+        if "." not in path.rsplit("/", 1)[-1]:
+            return self.index
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        path = scope["path"]
+        method = scope["method"]
+        asset = None
+        if method in ("GET", "HEAD") and not path.startswith(self.api_prefix):
+            asset = self._resolve(path)
+        if asset is None:
+            await _send_plain(send, 404, b"Not Found")
+            return
+
+        request_headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        encoding = "identity"
+        if asset.variants:
+            encoding = negotiate(request_headers.get("accept-encoding"), tuple(asset.variants))
+        etag = variant_etag(asset.etag, encoding)
+        headers = [
+            (b"etag", etag.encode()),
+            (b"last-modified", asset.last_modified.encode()),
+            (b"cache-control", asset.cache_control.encode()),
+        ]
+        if asset.compressible:
+            headers.append((b"vary", b"Accept-Encoding"))
+
+        if _not_modified(request_headers, asset):
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if encoding == "identity":
+            file_path, size, data = asset.path, asset.size, asset.data
+        else:
+            file_path, size, data = asset.variants[encoding]
+            headers.append((b"content-encoding", encoding.encode()))
+        headers.append((b"content-type", asset.content_type.encode()))
+        headers.append((b"content-length", str(size).encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+
+        if method == "HEAD":
+            await send({"type": "http.response.body", "body": b""})
+        elif data is not None:
+            await send({"type": "http.response.body", "body": data})
+        elif "http.response.pathsend" in (scope.get("extensions") or {}):
+            # Servers that support it hand the file to sendfile() directly
+            await send({"type": "http.response.pathsend", "path": str(file_path)})
+        else:
+            await _send_mmap(send, file_path, size)
+
+
+def _not_modified(request_headers: dict, asset: Asset) -> bool:
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, asset.etag)
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return parsedate_to_datetime(if_modified_since).timestamp() >= asset.mtime
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+async def _send_mmap(send, path: Path, size: int) -> None:
+    """Stream a large file from a memory map without copying it into Python bytes.
+
+    The map is not closed explicitly: the server may still hold a slice in
+    its write buffer, and the map is unmapped once the last slice is freed.
+    """
+    with open(path, "rb") as file:
+        view = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+    for offset in range(0, size, CHUNK_SIZE):
+        end = min(offset + CHUNK_SIZE, size)
+        await send({"type": "http.response.body", "body": view[offset:end], "more_body": end < size})
+
+
+async def _send_plain(send, status: int, body: bytes) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"text/plain; charset=utf-8"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
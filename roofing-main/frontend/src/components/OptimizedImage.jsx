@@ -1,7 +1,10 @@
 import { useState, memo } from 'react';
+import Picture from './Picture';
 
 const OptimizedImage = memo(function OptimizedImage({ 
   src, 
+  image,
+  sizes = '100vw',
   alt, 
   className = '', 
   wrapperClassName = '',
@@ -17,8 +20,10 @@ const OptimizedImage = memo(function OptimizedImage({
         <div className="absolute inset-0 bg-slate-100 animate-pulse" />
       )}
       
-      <img
-        src={src}
+      <Picture
+        image={image}
+        fallback={src}
+        sizes={sizes}
         alt={alt}
         loading={priority ? "eager" : "lazy"}
         decoding="async"
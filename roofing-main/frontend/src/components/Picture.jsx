@@ -0,0 +1,34 @@
+import { memo } from 'react';
+
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+const SOURCE_TYPES = { avif: 'image/avif', webp: 'image/webp' };
+
+const absolute = (srcset) =>
+  srcset.split(', ').map((entry) => `${BACKEND_URL}${entry}`).join(', ');
+
+// Serves the backend's resized AVIF/WebP/JPEG variants when the catalog item
+// carries an `image` block, and the original image_url otherwise.
+const Picture = memo(function Picture({ image, fallback, sizes, alt, ...imgProps }) {
+  if (!image) {
+    return <img src={fallback} alt={alt} {...imgProps} />;
+  }
+
+  return (
+    <picture className="contents">
+      {Object.entries(SOURCE_TYPES)
+        .filter(([format]) => image.srcset[format])
+        .map(([format, type]) => (
+          <source key={format} type={type} srcSet={absolute(image.srcset[format])} sizes={sizes} />
+        ))}
+      <img
+        src={`${BACKEND_URL}${image.src}`}
+        srcSet={image.srcset.jpeg ? absolute(image.srcset.jpeg) : undefined}
+        sizes={sizes}
+        alt={alt}
+        {...imgProps}
+      />
+    </picture>
+  );
+});
+
+export default Picture;
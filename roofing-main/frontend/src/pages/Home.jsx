@@ -3,6 +3,7 @@ import { Link } from "react-router-dom";
 import { motion } from "framer-motion";
 import { Phone, ArrowRight, Shield, Award, Clock, CheckCircle } from "lucide-react";
 import axios from "axios";
+import Picture from "../components/Picture";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -57,8 +58,10 @@ const ServiceCard = memo(function ServiceCard({ service }) {
     >
       <div className="aspect-[4/3] overflow-hidden bg-slate-100">
         {!imageLoaded && <div className="absolute inset-0 bg-slate-100 animate-pulse" />}
-        <img
-          src={service.image_url}
+        <Picture
+          image={service.image}
+          fallback={service.image_url}
+          sizes="(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw"
           alt={service.title}
           loading="lazy"
           decoding="async"
@@ -90,8 +93,10 @@ const ProjectCard = memo(function ProjectCard({ project }) {
       className="group relative aspect-[4/5] overflow-hidden cursor-pointer bg-slate-100"
     >
       {!imageLoaded && <div className="absolute inset-0 bg-slate-100 animate-pulse" />}
-      <img
-        src={project.image_url}
+      <Picture
+        image={project.image}
+        fallback={project.image_url}
+        sizes="(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw"
         alt={project.title}
         loading="lazy"
         decoding="async"
@@ -3,6 +3,7 @@ import { motion, AnimatePresence } from "framer-motion";
 import { Link } from "react-router-dom";
 import { X, ArrowRight } from "lucide-react";
 import axios from "axios";
+import Picture from "../components/Picture";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -35,8 +36,10 @@ const ProjectGridCard = memo(function ProjectGridCard({ project, index, onClick
       {!imageLoaded && (
         <div className="absolute inset-0 bg-slate-100 animate-pulse" />
       )}
-      <img
-        src={project.image_url}
+      <Picture
+        image={project.image}
+        fallback={project.image_url}
+        sizes="(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw"
         alt={project.title}
         loading="lazy"
         decoding="async"
@@ -204,8 +207,10 @@ export default function Projects() {
               </button>
               
               <div className="grid grid-cols-1 lg:grid-cols-2">
-                <img
-                  src={selectedProject.image_url}
+                <Picture
+                  image={selectedProject.image}
+                  fallback={selectedProject.image_url}
+                  sizes="(min-width: 1024px) 50vw, 100vw"
                   alt={selectedProject.title}
                   className="w-full aspect-square lg:aspect-auto lg:h-full object-cover"
                 />
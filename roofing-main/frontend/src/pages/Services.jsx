@@ -3,6 +3,7 @@ import { motion } from "framer-motion";
 import { Link } from "react-router-dom";
 import { ArrowRight, CheckCircle, Phone } from "lucide-react";
 import axios from "axios";
+import Picture from "../components/Picture";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -82,8 +83,10 @@ export default function Services() {
                 >
                   <div className={index % 2 === 1 ? "lg:order-2" : ""}>
                     <div className="relative overflow-hidden aspect-[4/3]">
-                      <img
-                        src={service.image_url}
+                      <Picture
+                        image={service.image}
+                        fallback={service.image_url}
+                        sizes="(min-width: 1024px) 50vw, 100vw"
                         alt={service.title}
                         className="w-full h-full object-cover transition-transform duration-700 hover:scale-105"
                       />
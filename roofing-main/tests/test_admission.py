@@ -0,0 +1,88 @@
+"""Admission control: bounded queues, request budgets and Mongo deadlines."""
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+from pymongo import _csot  # noqa: E402
+from pymongo.errors import ExecutionTimeout  # noqa: E402
+
+from admission import AdmissionLimit, AdmissionMiddleware  # noqa: E402
+
+
+async def ok(send, body: bytes = b"{}"):
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": body})
+
+
+def make_app(handler, limit: AdmissionLimit, budget=None):
+    async def app(scope, receive, send):
+        await handler(scope, send)
+
+    return AdmissionMiddleware(app, {("GET", "/limited"): (limit, budget)})
+
+
+async def get_all(app, count: int, path: str = "/limited"):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        return await asyncio.gather(*(client.get(path) for _ in range(count)))
+
+
+def test_full_queue_is_shed_with_retry_after():
+    async def slow(scope, send):
+        await asyncio.sleep(0.05)
+        await ok(send)
+
+    limit = AdmissionLimit("test_queue", concurrency=1, queue=1)
+    responses = asyncio.run(get_all(make_app(slow, limit), 4))
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [200, 200, 503, 503]
+    shed = [response for response in responses if response.status_code == 503]
+    assert all(int(response.headers["retry-after"]) >= 1 for response in shed)
+    assert limit.active == 0 and limit.waiting == 0
+
+
+def test_waiter_past_its_budget_is_shed():
+    async def slow(scope, send):
+        await asyncio.sleep(0.2)
+        await ok(send)
+
+    limit = AdmissionLimit("test_deadline", concurrency=1, queue=10)
+    responses = asyncio.run(get_all(make_app(slow, limit, budget=0.05), 2))
+    assert sorted(response.status_code for response in responses) == [200, 503]
+
+
+def test_admitted_request_runs_under_the_remaining_budget():
+    seen = []
+
+    async def record(scope, send):
+        seen.append(_csot.get_timeout())
+        await ok(send)
+
+    limit = AdmissionLimit("test_budget", concurrency=1, queue=1)
+    asyncio.run(get_all(make_app(record, limit, budget=2.0), 1))
+    assert seen and 0 < seen[0] <= 2.0
+
+
+def test_unlisted_routes_pass_straight_through():
+    seen = []
+
+    async def record(scope, send):
+        seen.append(_csot.get_timeout())
+        await ok(send)
+
+    limit = AdmissionLimit("test_unlisted", concurrency=1, queue=0)
+    responses = asyncio.run(get_all(make_app(record, limit, budget=2.0), 3, path="/other"))
+    assert [response.status_code for response in responses] == [200, 200, 200]
+    assert seen == [None, None, None]
+
+
+def test_mongo_timeout_becomes_503():
+    async def timing_out(scope, send):
+        raise ExecutionTimeout("operation exceeded time limit", 50, {"errmsg": "operation exceeded time limit"})
+
+    limit = AdmissionLimit("test_mongo_timeout", concurrency=1, queue=1)
+    (response,) = asyncio.run(get_all(make_app(timing_out, limit, budget=1.0), 1))
+    assert response.status_code == 503
+    assert "retry-after" in response.headers
@@ -0,0 +1,98 @@
+"""Email outbox delivery, retries and the sweeper, with the FakeTransport."""
+import asyncio
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from mongomock_motor import AsyncMongoMockClient  # noqa: E402
+
+from db_indexes import INDEXES  # noqa: E402
+from email_outbox import DEAD, PENDING, SENT, EmailOutbox, FakeTransport  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    return AsyncMongoMockClient()["outbox_test"]
+
+
+def outbox(db, transport, **kwargs) -> EmailOutbox:
+    kwargs.setdefault("base_delay", 0.0)
+    return EmailOutbox(db, transport, **kwargs)
+
+
+def compose_for(box: EmailOutbox):
+    def compose(quote: dict) -> list:
+        return [
+            box.message(quote["id"], "admin", "office@example.com", "New quote", "<p>new</p>"),
+            box.message(quote["id"], "customer", quote["email"], "Thanks", "<p>thanks</p>"),
+        ]
+
+    return compose
+
+
+async def stored_quote(db, minutes_old: float, notifications: dict) -> dict:
+    quote = {
+        "id": str(uuid.uuid4()),
+        "email": "jo@example.com",
+        "created_at": datetime.now(timezone.utc) - timedelta(minutes=minutes_old),
+        "notifications": notifications,
+    }
+    await db.quotes.insert_one(dict(quote))
+    return quote
+
+
+def test_delivers_and_marks_the_quote(db):
+    async def scenario():
+        transport = FakeTransport()
+        box = outbox(db, transport)
+        quote = await stored_quote(db, 0, {"customer": PENDING})
+        await box.enqueue([box.message(quote["id"], "customer", quote["email"], "Thanks", "<p>thanks</p>")])
+        assert await box.drain() == 1
+        assert [m["to_email"] for m in transport.sent] == ["jo@example.com"]
+        assert (await db.quotes.find_one({"id": quote["id"]}))["notifications"]["customer"] == SENT
+
+    asyncio.run(scenario())
+
+
+def test_retries_then_dead_letters(db):
+    async def scenario():
+        transport = FakeTransport(fail_times=10)
+        box = outbox(db, transport, max_attempts=3)
+        quote = await stored_quote(db, 0, {"customer": PENDING})
+        await box.enqueue([box.message(quote["id"], "customer", quote["email"], "Thanks", "<p>thanks</p>")])
+        await box.drain()
+        message = await db.email_outbox.find_one({"quote_id": quote["id"]})
+        assert message["status"] == DEAD and message["attempts"] == 3
+        assert (await db.quotes.find_one({"id": quote["id"]}))["notifications"]["customer"] == DEAD
+
+    asyncio.run(scenario())
+
+
+def test_sweeper_queues_only_what_was_never_queued(db):
+    async def scenario():
+        await db.email_outbox.create_indexes(INDEXES["email_outbox"])
+        transport = FakeTransport()
+        box = outbox(db, transport, sweep_grace=60)
+        box.compose = compose_for(box)
+
+        orphan = await stored_quote(db, 5, {"admin": PENDING, "customer": PENDING})
+        half = await stored_quote(db, 5, {"admin": PENDING, "customer": PENDING})
+        await box.enqueue([m for m in box.compose(half) if m["kind"] == "admin"])
+        await stored_quote(db, 0, {"admin": PENDING, "customer": PENDING})  # still within the grace period
+        await stored_quote(db, 5, {"admin": SENT, "customer": SENT})
+
+        assert await box.sweep() == 3
+        assert await box.sweep() == 0
+        # A late enqueue from the original request is absorbed by the unique index
+        await box.enqueue(box.compose(orphan))
+        assert await db.email_outbox.count_documents({}) == 4
+
+        await box.drain()
+        assert len(transport.sent) == 4
+
+    asyncio.run(scenario())
@@ -0,0 +1,68 @@
+"""Duplicate suppression on POST /api/quote, in-process against mongomock-motor."""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+
+from benchmarks import harness  # noqa: E402
+from quote_dedupe import _LRU  # noqa: E402
+
+server = harness.server
+
+
+@pytest.fixture
+def app():
+    app, db, transport = harness.install()
+    return app
+
+
+def submit(app, *requests, forget=False):
+    """POST each (body, Idempotency-Key) in turn; `forget` empties the in-process LRU between them"""
+    async def scenario():
+        responses = []
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            for body, key in requests:
+                if forget:
+                    server.quote_deduplicator.cache = _LRU(100)
+                headers = {"Idempotency-Key": key} if key else {}
+                responses.append(await client.post("/api/quote", json=body, headers=headers))
+        return responses
+
+    return asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("forget", [False, True])
+def test_same_key_same_body_replays(app, forget):
+    body = harness.quote_payload(1)
+    first, again = submit(app, (body, "k1"), (body, "k1"), forget=forget)
+    assert first.status_code == again.status_code == 200
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert again.json()["id"] == first.json()["id"]
+
+
+@pytest.mark.parametrize("forget", [False, True])
+def test_same_key_different_body_is_rejected(app, forget):
+    first, reused = submit(app, (harness.quote_payload(1), "k1"), (harness.quote_payload(2), "k1"), forget=forget)
+    assert first.status_code == 200
+    assert reused.status_code == 422
+
+
+@pytest.mark.parametrize("forget", [False, True])
+def test_fresh_key_per_retry_still_replays(app, forget):
+    body = harness.quote_payload(1)
+    first, retry, retry_again = submit(app, (body, "k1"), (body, "k2"), (body, "k2"), forget=forget)
+    assert retry.headers.get("Idempotent-Replayed") == "true"
+    assert retry.json()["id"] == retry_again.json()["id"] == first.json()["id"]
+
+
+def test_fingerprint_replays_without_a_key(app):
+    body = harness.quote_payload(1)
+    first, again, other = submit(app, (body, None), (body, None), (harness.quote_payload(2), None), forget=True)
+    assert again.json()["id"] == first.json()["id"]
+    assert "Idempotent-Replayed" not in other.headers
+    assert other.json()["id"] != first.json()["id"]
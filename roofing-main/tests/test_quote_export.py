@@ -0,0 +1,48 @@
+"""CSV export escaping, against mongomock-motor."""
+import asyncio
+import csv
+import io
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from mongomock_motor import AsyncMongoMockClient  # noqa: E402
+
+import quote_export  # noqa: E402
+
+
+def export_rows(doc: dict) -> list:
+    async def scenario():
+        collection = AsyncMongoMockClient()["export_test"].quotes
+        await collection.insert_one({"id": "q1", "created_at": datetime(2026, 1, 1, tzinfo=timezone.utc), **doc})
+        return b"".join([chunk async for chunk, _ in quote_export.export_chunks(collection)])
+
+    body = asyncio.run(scenario()).decode("utf-8")
+    header, row = list(csv.reader(io.StringIO(body)))
+    return dict(zip(header, row))
+
+
+def test_formula_cells_are_escaped():
+    row = export_rows({
+        "name": '=HYPERLINK("http://example.com")',
+        "address": "@SUM(A1:A9)",
+        "message": "+cmd|' /C calc'!A0",
+        "service_type": "-2+3*cmd",
+    })
+    assert row["name"] == '\'=HYPERLINK("http://example.com")'
+    assert row["address"] == "'@SUM(A1:A9)"
+    assert row["message"] == "'+cmd|' /C calc'!A0"
+    assert row["service_type"] == "'-2+3*cmd"
+
+
+def test_phones_and_numbers_are_left_alone():
+    row = export_rows({"phone": "+61 448 046 461", "address": "-12.5", "name": "+61 (2) 9999-1234"})
+    assert row["phone"] == "+61 448 046 461"
+    assert row["address"] == "-12.5"
+    assert row["name"] == "+61 (2) 9999-1234"
+
+
+def test_text_starting_with_a_dash_is_escaped():
+    assert export_rows({"message": "- replace gutters"})["message"] == "'- replace gutters"
@@ -0,0 +1,171 @@
+"""Archive -> verify -> delete -> rehydrate, and the archival lease.
+
+Runs against the in-memory Mongo stand-in (mongomock-motor).
+"""
+import asyncio
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from mongomock_motor import AsyncMongoMockClient  # noqa: E402
+
+import quote_retention  # noqa: E402
+from quote_retention import ArchiveCorrupt, QuoteArchiver  # noqa: E402
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def quote(days_old: int) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "name": f"Customer {days_old}",
+        "email": f"c{days_old}@example.com",
+        "phone": "0400000000",
+        "service_type": "Re-Roofing",
+        "created_at": NOW - timedelta(days=days_old),
+    }
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def db():
+    return AsyncMongoMockClient()["retention_test"]
+
+
+def archiver(db, tmp_path, **kwargs) -> QuoteArchiver:
+    kwargs.setdefault("chunk_size", 10)
+    kwargs.setdefault("duty_cycle", 1.0)
+    return QuoteArchiver(db, tmp_path, archive_after_months=12, **kwargs)
+
+
+async def seed(db, days_old):
+    docs = [quote(days) for days in days_old]
+    await db.quotes.insert_many([dict(doc) for doc in docs])
+    return docs
+
+
+def test_archive_then_rehydrate(db, tmp_path):
+    async def scenario():
+        await seed(db, [10, 400, 401, 402])
+        result = await archiver(db, tmp_path).run_once()
+        assert result["archived"] == 3
+        assert await db.quotes.count_documents({}) == 1
+        assert archiver(db, tmp_path).verify() == []
+
+        day = (NOW - timedelta(days=401)).date()
+        restored = await archiver(db, tmp_path).rehydrate(day, day + timedelta(days=1))
+        assert restored["restored"] == 2
+        assert restored["missing_days"] == []
+        copy = await db.quotes.find_one({"name": "Customer 401"})
+        assert isinstance(copy["created_at"], datetime)
+        assert "rehydrated_until" in copy
+
+    run(scenario())
+
+
+def test_corrupt_part_blocks_deletion(db, tmp_path, monkeypatch):
+    read_part = quote_retention._read_part
+
+    def corrupting_read(path):
+        data = bytearray(path.read_bytes())
+        data[len(data) // 2] ^= 0xFF
+        path.write_bytes(bytes(data))
+        return read_part(path)
+
+    monkeypatch.setattr(quote_retention, "_read_part", corrupting_read)
+
+    async def scenario():
+        await seed(db, [400, 401])
+        with pytest.raises(ArchiveCorrupt):
+            await archiver(db, tmp_path).archive_chunk(archiver(db, tmp_path).cutoff())
+        assert await db.quotes.count_documents({}) == 2
+
+    run(scenario())
+
+
+def test_rehydrated_copy_is_never_rearchived(db, tmp_path):
+    async def scenario():
+        await seed(db, [400])
+        await archiver(db, tmp_path).run_once()
+        day = (NOW - timedelta(days=400)).date()
+        await archiver(db, tmp_path).rehydrate(day, day)
+
+        result = await archiver(db, tmp_path).run_once()
+        assert result["archived"] == 0
+        assert await db.quotes.count_documents({"rehydrated_until": {"$exists": True}}) == 1
+        assert len(list((tmp_path / "quotes").glob("*/part-*.ndjson.gz"))) == 1
+
+    run(scenario())
+
+
+def test_rehydrate_reports_days_without_partitions(db, tmp_path):
+    day = (NOW - timedelta(days=900)).date()
+    result = run(archiver(db, tmp_path).rehydrate(day, day))
+    assert result["restored"] == 0
+    assert result["missing_days"] == [day.isoformat()]
+
+
+def test_lost_lease_stops_the_pass(db, tmp_path):
+    async def scenario():
+        await seed(db, range(400, 430))
+
+        async def steal():
+            await db.job_leases.update_one(
+                {"_id": quote_retention.LEASE_ID},
+                {"$set": {"owner": "other-worker", "locked_until": NOW + timedelta(hours=1)}},
+            )
+
+        stolen = []
+
+        def busy():
+            # Runs in the throttle after the first chunk
+            if not stolen:
+                stolen.append(asyncio.ensure_future(steal()))
+            return False
+
+        first = archiver(db, tmp_path, busy=busy)
+        original_throttle = first._throttle
+
+        async def throttle(elapsed):
+            await original_throttle(elapsed)
+            await asyncio.gather(*stolen)
+
+        first._throttle = throttle
+        result = await first.run_once()
+        assert result["lease_lost"]
+        assert result["archived"] == 10
+        assert await db.quotes.count_documents({}) == 20
+
+        # The other worker still holds the lease, so this one skips entirely
+        assert (await archiver(db, tmp_path).run_once())["skipped"]
+
+    run(scenario())
+
+
+def test_archiving_requires_an_archive_dir(db):
+    with pytest.raises(ValueError):
+        QuoteArchiver(db, None, archive_after_months=12)
+
+
+def test_string_timestamps_are_reported_not_archived(db, tmp_path, caplog):
+    async def scenario():
+        await seed(db, [400])
+        legacy = quote(500)
+        legacy["created_at"] = legacy["created_at"].isoformat()
+        await db.quotes.insert_one(legacy)
+
+        with caplog.at_level("WARNING", logger="quote_retention"):
+            result = await archiver(db, tmp_path).run_once()
+        assert result["archived"] == 1
+        assert await db.quotes.count_documents({"id": legacy["id"]}) == 1
+        assert "1 quotes have a string created_at" in caplog.text
+
+    run(scenario())
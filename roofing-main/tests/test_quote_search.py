@@ -0,0 +1,64 @@
+"""Type-ahead and number lookups in /api/quotes/search, against mongomock-motor."""
+import asyncio
+import sys
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from mongomock_motor import AsyncMongoMockClient  # noqa: E402
+
+import quote_search  # noqa: E402
+
+
+def quote(name: str, phone: str = "0448046461", address: str = "1 Example Street, Blacktown NSW 2148") -> dict:
+    doc = {
+        "id": str(uuid.uuid4()),
+        "name": name,
+        "email": "customer@example.com",
+        "phone": phone,
+        "service_type": "Re-Roofing",
+        "address": address,
+        "message": "Leaking valley",
+        "created_at": datetime.now(timezone.utc),
+    }
+    doc["search"] = quote_search.search_keys(doc)
+    return doc
+
+
+@pytest.fixture
+def collection():
+    collection = AsyncMongoMockClient()["search_test"].quotes
+    asyncio.run(collection.insert_many([
+        quote("Liam O'Brien"),
+        quote("J Smith", phone="0298765432", address="9 Hill Road, Penrith NSW 2750"),
+    ]))
+    return collection
+
+
+def names(collection, q: str, prefix: bool = True) -> list:
+    docs, _ = asyncio.run(quote_search.search(collection, q, prefix=prefix))
+    return sorted(doc["name"] for doc in docs)
+
+
+@pytest.mark.parametrize("q", ["O'Brien", "liam o'b", "o bri"])
+def test_prefix_search_skips_one_letter_words(collection, q):
+    assert names(collection, q) == ["Liam O'Brien"]
+
+
+@pytest.mark.parametrize("q", ["J Smith", "j smi"])
+def test_prefix_search_with_an_initial(collection, q):
+    assert names(collection, q) == ["J Smith"]
+
+
+def test_short_number_matches_address_keywords(collection):
+    assert names(collection, "2148") == ["Liam O'Brien"]
+    assert names(collection, "2148", prefix=False) == ["Liam O'Brien"]
+
+
+def test_phone_prefix(collection):
+    assert names(collection, "0298 7") == ["J Smith"]
+    assert names(collection, "+61 448 046 461", prefix=False) == ["Liam O'Brien"]
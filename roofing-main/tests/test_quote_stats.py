@@ -0,0 +1,90 @@
+"""Quote counters and their rebuild, against mongomock-motor.
+
+mongomock has no $toDate, so the rebuild reads its day groups from a stand-in
+for the quotes aggregation.
+"""
+import asyncio
+import sys
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from mongomock_motor import AsyncMongoMockClient  # noqa: E402
+
+from quote_stats import QuoteStats, bucket_id  # noqa: E402
+
+
+class Groups:
+    """Quotes collection stand-in; `during` runs while the rebuild is reading"""
+
+    def __init__(self, groups, during=None):
+        self.groups = groups
+        self.during = during
+
+    def aggregate(self, *args, **kwargs):
+        async def cursor():
+            for day, service_type, count in self.groups:
+                if self.during is not None:
+                    await self.during()
+                    self.during = None
+                yield {"_id": {"day": day, "service_type": service_type}, "count": count}
+
+        return cursor()
+
+
+@pytest.fixture
+def stats():
+    return QuoteStats(AsyncMongoMockClient()["stats_test"], tz="UTC")
+
+
+def at(day: str) -> datetime:
+    return datetime.fromisoformat(day + "T02:00:00+00:00")
+
+
+async def counts(stats) -> dict:
+    return {doc["_id"]: doc["count"] async for doc in stats.collection.find({})}
+
+
+def test_record_counts_day_and_week(stats):
+    async def scenario():
+        await stats.record("Re-Roofing", at("2026-03-04"))
+        await stats.record("Re-Roofing", at("2026-03-05"))
+        return await counts(stats)
+
+    assert asyncio.run(scenario()) == {
+        bucket_id("day", date(2026, 3, 4), "Re-Roofing"): 1,
+        bucket_id("day", date(2026, 3, 5), "Re-Roofing"): 1,
+        bucket_id("week", date(2026, 3, 2), "Re-Roofing"): 2,
+    }
+
+
+def test_prune_keeps_buckets_created_during_the_rebuild(stats):
+    async def scenario():
+        await stats.record("Skylights", at("2026-01-07"))  # no quotes left behind it
+        await asyncio.sleep(0.01)  # markers are only compared to the millisecond
+
+        async def live_submission():
+            await stats.record("Metal Roofing", at("2026-03-10"))
+
+        await stats.backfill(Groups([("2026-03-04", "Re-Roofing", 3)], during=live_submission), prune=True)
+        return await counts(stats)
+
+    result = asyncio.run(scenario())
+    assert result[bucket_id("day", date(2026, 3, 4), "Re-Roofing")] == 3
+    assert result[bucket_id("day", date(2026, 3, 10), "Metal Roofing")] == 1
+    assert bucket_id("day", date(2026, 1, 7), "Skylights") not in result
+
+
+def test_rebuild_leaves_archived_days_alone(stats):
+    async def scenario():
+        await stats.record("Re-Roofing", at("2026-01-01"))
+        groups = Groups([("2026-01-01", "Re-Roofing", 0), ("2026-03-04", "Re-Roofing", 2)])
+        await stats.backfill(groups, prune=True, since=date(2026, 2, 1))
+        return await counts(stats)
+
+    result = asyncio.run(scenario())
+    assert result[bucket_id("day", date(2026, 1, 1), "Re-Roofing")] == 1
+    assert result[bucket_id("day", date(2026, 3, 4), "Re-Roofing")] == 2
@@ -0,0 +1,98 @@
+"""Write-behind quote inserts and what a failed insert does to its claim."""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from mongomock_motor import AsyncMongoMockClient  # noqa: E402
+from pymongo.errors import BulkWriteError, DuplicateKeyError, ExecutionTimeout  # noqa: E402
+
+from quote_dedupe import QuoteDeduplicator  # noqa: E402
+from quote_writer import QuoteWriter, not_written  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    return AsyncMongoMockClient()["writer_test"]
+
+
+async def insert_all(writer: QuoteWriter, docs):
+    return await asyncio.gather(*(writer.insert(doc) for doc in docs), return_exceptions=True)
+
+
+def test_batches_concurrent_inserts(db):
+    async def scenario():
+        writer = QuoteWriter(db, batching=True, batch_size=3, max_delay=0.01)
+        calls = []
+        insert_many = writer.collection.insert_many
+
+        async def counting(docs, **kwargs):
+            calls.append(len(docs))
+            return await insert_many(docs, **kwargs)
+
+        writer.collection.insert_many = counting
+        results = await insert_all(writer, [{"id": str(i)} for i in range(5)])
+        assert results == [None] * 5
+        assert calls == [3, 2]
+        assert await db.quotes.count_documents({}) == 5
+
+    asyncio.run(scenario())
+
+
+def test_duplicate_fails_only_its_own_caller(db):
+    async def scenario():
+        await db.quotes.create_index("id", unique=True)
+        await db.quotes.insert_one({"id": "taken"})
+        writer = QuoteWriter(db, batching=True, batch_size=3)
+        results = await insert_all(writer, [{"id": "a"}, {"id": "taken"}, {"id": "b"}])
+        assert results[0] is None and results[2] is None
+        assert isinstance(results[1], DuplicateKeyError)
+        assert not_written(results[1])
+
+    asyncio.run(scenario())
+
+
+def test_write_concern_error_is_an_unknown_outcome(db):
+    async def scenario():
+        writer = QuoteWriter(db, batching=True, batch_size=2)
+        insert_many = writer.collection.insert_many
+
+        async def unacknowledged(docs, **kwargs):
+            await insert_many(docs, **kwargs)
+            raise BulkWriteError({
+                "writeErrors": [],
+                "writeConcernErrors": [{"code": 64, "errmsg": "waiting for replication timed out"}],
+                "nInserted": len(docs),
+            })
+
+        writer.collection.insert_many = unacknowledged
+        results = await insert_all(writer, [{"id": "a"}, {"id": "b"}])
+        assert all(isinstance(result, BulkWriteError) for result in results)
+        assert not any(not_written(result) for result in results)
+        assert not not_written(ExecutionTimeout("operation exceeded time limit"))
+
+    asyncio.run(scenario())
+
+
+def test_settled_claim_is_kept_when_the_quote_was_stored(db):
+    async def scenario():
+        dedupe = QuoteDeduplicator(db, settle_seconds=0)
+        data = {"name": "Jo", "email": "jo@example.com"}
+        stored = [("key:stored", 60)]
+        lost = [("key:lost", 60)]
+        assert await dedupe.claim(stored, "q1", data) is None
+        assert await dedupe.claim(lost, "q2", data) is None
+        await db.quotes.insert_one({"id": "q1"})
+
+        dedupe.settle(stored, "q1")
+        dedupe.settle(lost, "q2")
+        await asyncio.gather(*dedupe._settling)
+
+        # The stored quote's claim still answers retries; the lost one is free again
+        assert await dedupe.claim(stored, "q3", data) == "q1"
+        assert await dedupe.claim(lost, "q4", data) is None
+
+    asyncio.run(scenario())